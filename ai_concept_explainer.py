@@ -1,67 +1,216 @@
 # Import necessary libraries
-import ollama  # Used to get local AI models
+import time
+import llm  # Shared, cached access to the local AI model
+import instrumentation
 import threading  # Allows background execution without freezing UI
+from concurrent.futures import CancelledError
 from customtkinter import *  # UI framework
-import pygame  # For playing sound effects
+import sound_bank  # Shared sound effects
+import ui_dispatch  # Worker threads hand widget updates to the UI thread through this
+from semantic_cache import get_semantic_cache  # Answers reworded repeats of earlier questions
 
-# Function to get concept explanation using the AI model
-def get_concept_explanation(prompt, display_widget):
-    # Enable and update the text widget to show "Thinking..."
+# Clicks closer together than this (milliseconds) count as one request
+DEBOUNCE_MS = 300
+
+# Message shown when the model cannot be reached
+ERROR_MESSAGE = "Something went wrong. Please try again or check your connection."
+
+
+# Latest-wins bookkeeping for one explainer window. Every request gets its own cancel
+# token and starting a new one cancels the one before, so a stale answer can never
+# overwrite a newer one and the model only works on the question being waited for.
+class LatestRequest:
+    def __init__(self):
+        self.token = None
+        self.prompt = None
+
+    # Cancel whatever is running and return the token for the new request
+    def start(self, prompt):
+        self.cancel()
+        self.token = llm.CancelToken()
+        self.prompt = prompt
+        return self.token
+
+    def cancel(self):
+        if self.token is not None:
+            self.token.cancel()
+        self.token = None
+
+    # Called when a request is done; only clears the newest one
+    def finished(self, token):
+        if self.token is token:
+            self.token = None
+
+    # True while this prompt is still being answered
+    def running(self, prompt):
+        return self.token is not None and prompt == self.prompt
+
+
+# Build the user query with instructions for explanation
+def build_query(prompt):
+    return (
+        f"Explain the following in a simple, clear way, as if to a student: {prompt}.\n"
+        f"Include a real-world analogy if appropriate. If it is asking you to solve something, do it step by step. "
+        f"If not a word or math problem, then do not include any math or word problems that do not relate to the topic provided. "
+        f"Do not include any math or word problems when not asked. This is very important."
+    )
+
+
+# Explanation stored for an earlier question that means the same, as (text, vector);
+# text is None on a miss, and vector goes to remember_explanation() afterwards
+def find_cached_explanation(prompt):
+    start = time.perf_counter()
+    try:
+        cached, similarity, vector = get_semantic_cache().lookup(prompt)
+    except Exception:
+        return None, None  # No embedding (e.g. the embedding model is missing), ask the model
+    instrumentation.emit({"type": "semantic_cache", "tool": "explainer", "hit": cached is not None,
+                          "similarity": round(similarity, 3),
+                          "lookup_ms": round((time.perf_counter() - start) * 1000, 1)})
+    return cached, vector
+
+
+# Store a finished explanation for similar questions later
+def remember_explanation(prompt, text, vector):
+    if vector is not None and text.strip():
+        get_semantic_cache().put(prompt, text, vector)
+
+
+# Stream the explanation from the model, yielding text as it is generated
+# (cancel, an llm.CancelToken, stops it early with CancelledError). A question
+# that means the same as an earlier one is answered from the semantic cache at once.
+def stream_concept_explanation(prompt, cancel=None):
+    cached, vector = find_cached_explanation(prompt)
+    if cached is not None:
+        yield cached
+        return
+
+    pieces = []
+    for piece in llm.stream_chat([
+        {"role": "user", "content": build_query(prompt)}
+    ], tool="explainer", cancel=cancel, accept=str.strip):
+        pieces.append(piece)
+        yield piece
+    # Only complete answers are stored (a cancelled or failed stream raises before this)
+    remember_explanation(prompt, "".join(pieces), vector)
+
+
+# Replace the text of the (read-only) output box; UI thread only
+def set_text(display_widget, text):
     display_widget.configure(state="normal")
     display_widget.delete("1.0", "end")
-    display_widget.insert("end", "Thinking 🤔...\n")
+    display_widget.insert("end", text)
     display_widget.configure(state="disabled")
 
+
+# Function to get concept explanation using the AI model. With a LatestRequest,
+# starting this cancels the window's previous request and discards its output.
+def get_concept_explanation(prompt, display_widget, stream=True, request=None):
+    token = request.start(prompt) if request else None
+
+    # Show "Thinking..." until the answer arrives
+    set_text(display_widget, "Thinking 🤔...\n")
+
+    if stream:
+        stream_to_widget(prompt, display_widget, token, request)
+        return
+
     # Function to run the AI request in a separate thread
     def fetch():
         try:
-            # Build the user query with instructions for explanation
-            query = (
-                f"Explain the following in a simple, clear way, as if to a student: {prompt}.\n"
-                f"Include a real-world analogy if appropriate. If it is asking you to solve something, do it step by step. "
-                f"If not a word or math problem, then do not include any math or word problems that do not relate to the topic provided. "
-                f"Do not include any math or word problems when not asked. This is very important."
-            )
-            # Send the query to the model
-            response = ollama.chat(model="phi", messages=[
-                {"role": "user", "content": query}
-            ])
-            # Extract and clean the response content
-            answer = response['message']['content'].strip()
+            answer, vector = find_cached_explanation(prompt)
+            if answer is None:
+                # Send the query to the model
+                answer = llm.chat([
+                    {"role": "user", "content": build_query(prompt)}
+                ], tool="explainer", accept=str.strip).strip()
+                remember_explanation(prompt, answer, vector)
         except Exception:
             # Fallback message in case of error
-            answer = "Something went wrong. Please try again or check your connection."
+            answer = ERROR_MESSAGE
+        ui_dispatch.post(show, answer, key=(display_widget, "text"))
 
-        # Display the AI's answer
-        display_widget.configure(state="normal")
-        display_widget.delete("1.0", "end")
-        display_widget.insert("end", answer)
-        display_widget.configure(state="disabled")
+    # UI thread: display the AI's answer
+    def show(answer):
+        # A newer question was asked in the meantime, this answer is stale
+        if token is not None and token.cancelled:
+            return
+        if request:
+            request.finished(token)
+        set_text(display_widget, answer)
 
     # Run the fetch function in a new thread
     threading.Thread(target=fetch).start()
 
 
-# Function to launch the concept explainer window
-def launch_ai_concept_explainer():
-    # Initialize the main window
-    window = CTk()
+# Stream tokens into the widget. The worker collects them and asks the UI thread for
+# a flush, and flushes queued within one UI frame merge, so the widget is written at
+# most once per frame. Once cancel (an llm.CancelToken) is cancelled, the stream stops
+# and nothing more is written.
+def stream_to_widget(prompt, display_widget, cancel=None, request=None):
+    lock = threading.Lock()
+    pending = []
+    state = {'done': False, 'started': False, 'failed': False}
+
+    # Worker thread: collect tokens, never touch the widget
+    def fetch():
+        try:
+            for token in stream_concept_explanation(prompt, cancel):
+                with lock:
+                    pending.append(token)
+                ui_dispatch.post(flush, key=flush)
+        except CancelledError:
+            return  # A newer request took over, its flushes own the widget now
+        except Exception:
+            state['failed'] = True
+        with lock:
+            state['done'] = True
+        ui_dispatch.post(flush, key=flush)
+
+    # UI thread: write everything collected since the last flush in one insert
+    def flush():
+        if cancel is not None and cancel.cancelled:
+            return
+        with lock:
+            text = "".join(pending)
+            pending.clear()
+            done = state['done']
+
+        if text or (done and not state['started']):
+            display_widget.configure(state="normal")
+            if not state['started']:
+                # Replace "Thinking..." with the first tokens
+                display_widget.delete("1.0", "end")
+                text = text.lstrip()
+                state['started'] = bool(text)
+            if state['failed'] and not state['started']:
+                text = ERROR_MESSAGE
+            display_widget.insert("end", text)
+            display_widget.configure(state="disabled")
+
+        if not done:
+            return
+        if request:
+            request.finished(cancel)
+        if state['failed'] and state['started']:
+            display_widget.configure(state="normal")
+            display_widget.insert("end", "\n\n" + ERROR_MESSAGE)
+            display_widget.configure(state="disabled")
+
+    threading.Thread(target=fetch, daemon=True).start()
+
+
+# Function to launch the concept explainer window (a child of the launcher's root)
+def launch_ai_concept_explainer(master=None):
+    # Initialize the tool window
+    window = CTkToplevel(master)
     window.title("AI Concept Explainer")
     window.geometry("800x600")
     window.configure(fg_color="#282c3f")
 
-    # Initialize sound system
-    pygame.mixer.init()
-    hover_sound = pygame.mixer.Sound("hover.wav")
-    click_sound = pygame.mixer.Sound("click.mp3")
-
-    # Function to play hover sound
-    def play_hover(event=None):
-        hover_sound.play()
-
     # Function to play click sound, then run a function
     def play_click(func):
-        click_sound.play()
+        sound_bank.play_click()
         window.after(100, func)
 
     # Label prompting user input
@@ -83,10 +232,31 @@ def launch_ai_concept_explainer():
         font=("Arial Rounded MT Bold", 17)
     )
     explain_button.place(relx=0.5, rely=0.92, anchor="s")
-    explain_button.bind("<Enter>", play_hover)  # Add hover sound
-    explain_button.configure(command=lambda: play_click(  # Add click sound and run logic
-        lambda: get_concept_explanation(input_entry.get(), output_text)
-    ))
+    request = LatestRequest()
+    last_click = {'time': float("-inf")}
+
+    # The first click starts right away; more clicks within DEBOUNCE_MS of it are ignored
+    def explain():
+        now = time.monotonic()
+        if (now - last_click['time']) * 1000 < DEBOUNCE_MS:
+            return
+        last_click['time'] = now
+        prompt = input_entry.get()
+        # The same question is already being answered, let it finish
+        if request.running(prompt):
+            return
+        get_concept_explanation(prompt, output_text, request=request)
+
+    explain_button.bind("<Enter>", sound_bank.play_hover)  # Add hover sound
+    explain_button.configure(command=lambda: play_click(explain))  # Add click sound and run logic
+
+    # Closing the window frees the model for other tools. An answer cut short that way
+    # is cleared, so reopening the window does not show "Thinking..." forever.
+    def on_hide():
+        if request.token is not None:
+            request.cancel()
+            set_text(output_text, "")
+
+    window.on_hide = on_hide
 
-    # Start the GUI event loop
-    window.mainloop()
+    return window
@@ -1,15 +1,12 @@
-import time
+import re
 import threading
 import tkinter as tk
 import random
-import ollama
+from collections import deque
+import llm
+from timer_engine import TimerEngine, format_time
 from customtkinter import *
-import pygame
-
-# Initialize sound effects
-pygame.mixer.init()
-click_sound = pygame.mixer.Sound("click.mp3")
-hover_sound = pygame.mixer.Sound("hover.wav")
+from sound_bank import play_hover, play_click
 
 # List of fallback motivational quotes (in case AI call fails)
 fallback_quotes = [
@@ -37,157 +34,239 @@ fallback_quotes = [
 
 # Creates a styled button with sound on click and hover
 def create_button(parent, text, command):
-    button = CTkButton(parent, text=text, font=("Arial Rounded MT Bold", 18), command=lambda: [click_sound.play(), command()], width=250, height=50, corner_radius=50)
+    button = CTkButton(parent, text=text, font=("Arial Rounded MT Bold", 18), command=lambda: [play_click(), command()], width=250, height=50, corner_radius=50)
     button.pack(pady=15)
-
-    def on_enter(event):
-        hover_sound.play()
-
-    button.bind("<Enter>", on_enter)
+    button.bind("<Enter>", play_hover)
     return button
 
 # Picks a random fallback quote
 def get_fallback_quote():
     return random.choice(fallback_quotes)
 
-# Gets a motivational quote from the AI (or fallback if it fails)
-def get_motivational_quote(total_seconds, total_minutes):
+# Quotes requested from the model in one call
+QUOTE_BATCH_SIZE = 10
+# Ask for a new batch when fewer than this many quotes are ready
+QUOTE_LOW_WATER = 3
+
+# Rough stage of the session, so buffered quotes still fit the time left
+def get_session_phase(total_seconds, total_minutes):
+    fraction_left = total_seconds / max(1, total_minutes * 60)
+    if fraction_left > 2 / 3:
+        return "just getting started"
+    if fraction_left > 1 / 3:
+        return "halfway through"
+    return "in the final stretch"
+
+# Gets a batch of motivational quotes from the AI in a single call (empty list if it fails)
+def get_motivational_quotes(total_seconds, total_minutes, count=QUOTE_BATCH_SIZE):
     prompt = (
-        f"There are {total_seconds} seconds left in a {total_minutes}-minute study session. "
-        f"Give ONE short, motivating sentence that makes me feel progress is being made. "
-        f"No math, no quotes, no extra things. Just one direct, motivating sentence. "
+        f"About {max(1, total_seconds // 60)} minutes are left in a {total_minutes}-minute study session, "
+        f"so the student is {get_session_phase(total_seconds, total_minutes)}. "
+        f"Write {count} different short, motivating sentences that make them feel progress is being made. "
+        f"Put each sentence on its own numbered line. No math, no quotes, no extra things."
     )
 
-    result = {"quote": None}
+    # A cached batch would repeat the same quotes every session, so always ask the model
+    try:
+        raw = llm.chat([
+            {'role': 'user', 'content': prompt}
+        ], use_cache=False, priority=llm.BACKGROUND, timeout=60, tool="timer")
+    except Exception:
+        return []
+
+    # Prefer the numbered lines, so an intro like "Here you go:" is skipped
+    lines = raw.splitlines()
+    listed = [line for line in lines if re.match(r"^\s*(\d+[.)]|[-*•])\s*", line)]
+    quotes = []
+    for line in listed or lines:
+        # Strip numbering, bullets and wrapping quotation marks
+        line = re.sub(r"^\s*(\d+[.)]|[-*•])\s*", "", line).strip().strip('"“”').strip()
+        if line and len(line) <= 200:
+            quotes.append(line)
+    return quotes[:count]
+
+# Keeps a few AI quotes ready so showing one never waits on the model
+class QuoteBuffer:
+    def __init__(self, total_minutes, batch_size=QUOTE_BATCH_SIZE, low_water=QUOTE_LOW_WATER):
+        self.total_minutes = total_minutes
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.ready = deque()
+        self.phase = None
+        self.refilling = False
+        self.lock = threading.Lock()
+
+    # Fetch a new batch in the background unless one is already on its way
+    def refill(self, total_seconds):
+        phase = get_session_phase(total_seconds, self.total_minutes)
+        with self.lock:
+            if self.refilling:
+                return
+            self.refilling = True
+
+        def fetch():
+            quotes = get_motivational_quotes(total_seconds, self.total_minutes, self.batch_size)
+            with self.lock:
+                # Drop the batch if the session moved on while it was generated
+                if phase == self.phase or self.phase is None:
+                    self.phase = phase
+                    self.ready.extend(quotes)
+                self.refilling = False
+
+        threading.Thread(target=fetch, daemon=True).start()
+
+    # Return a ready quote right away (fallback if none), topping the buffer up when low
+    def get(self, total_seconds):
+        phase = get_session_phase(total_seconds, self.total_minutes)
+        with self.lock:
+            if phase != self.phase:
+                # Quotes written for an earlier stage no longer fit
+                self.ready.clear()
+                self.phase = phase
+            quote = self.ready.popleft() if self.ready else None
+            running_low = len(self.ready) < self.low_water
+        if running_low:
+            self.refill(total_seconds)
+        return quote or get_fallback_quote()
+
+# Main function to launch the AI timer: one window holding both screens, reused across resets
+def launch_ai_timer(master=None):
+    window = CTkToplevel(master)
+    window.title("AI Timer")
+    window.configure(fg_color="#282c3f")
 
-    def fetch_quote():
-        try:
-            response = ollama.chat(model='phi', messages=[
-                {'role': 'user', 'content': prompt}
-            ])
-            result["quote"] = response['message']['content'].strip()
-        except Exception:
-            result["quote"] = get_fallback_quote()
+    # First screen: ask for study duration
+    input_screen = CTkFrame(window, fg_color="transparent")
 
-    # Run quote fetching in a thread with timeout
-    quote_thread = threading.Thread(target=fetch_quote)
-    quote_thread.start()
-    quote_thread.join(timeout=15)
+    label = CTkLabel(input_screen, text="Enter study timer duration (minutes):", font=("Segoe UI", 24))
+    label.pack(pady=30)
 
-    if result["quote"] is None:
-        result["quote"] = get_fallback_quote()
+    timer_input = CTkEntry(input_screen, font=("Arial Rounded MT Bold", 16), width=200)
+    timer_input.pack(pady=10)
 
-    return result["quote"]
+    error_label = CTkLabel(input_screen, text="", font=("Arial Rounded MT Bold", 16), text_color="red")
+    error_label.pack()
 
-# Main function to launch the AI timer
-def launch_ai_timer():
-    # First screen: ask for study duration
-    def show_timer_input_screen():
-        timer_input_frame = CTk()
-        timer_input_frame.title("AI Timer")
-        timer_input_frame.geometry("600x400")
-        timer_input_frame.configure(fg_color="#282c3f")
-
-        label = CTkLabel(timer_input_frame, text="Enter study timer duration (minutes):", font=("Segoe UI", 24))
-        label.pack(pady=30)
-
-        timer_input = CTkEntry(timer_input_frame, font=("Arial Rounded MT Bold", 16), width=200)
-        timer_input.pack(pady=10)
-
-        error_label = CTkLabel(timer_input_frame, text="", font=("Arial Rounded MT Bold", 16), text_color="red")
-        error_label.pack()
-
-        # Handle timer duration input
-        def get_duration():
-            try:
-                mins = int(timer_input.get())
-                timer_input_frame.destroy()
-                start_ai_timer(mins)
-            except ValueError:
-                error_label.configure(text="Please enter a valid number.")
-
-        # Start button with sound and input validation
-        start_button = CTkButton(timer_input_frame, text="Start Timer",
-                                 command=lambda: [click_sound.play(), get_duration()],
-                                 corner_radius=50, width=250, height=50, font=("Arial Rounded MT Bold", 18))
-        start_button.pack(pady=30)
-
-        def on_enter_start(event):
-            hover_sound.play()
-
-        start_button.bind("<Enter>", on_enter_start)
-        timer_input_frame.mainloop()
-
-    # Starts the actual timer with countdown and quotes
-    def start_ai_timer(duration_minutes):
-        app = CTk()
-        app.title("AI Timer")
-        app.geometry("800x600")
-        app.configure(fg_color="#282c3f")
-
-        # Countdown display
-        countdown_label = CTkLabel(app, text="Time left: 00:00", font=("Segoe UI", 35))
-        countdown_label.pack(pady=25)
-
-        # Motivational quote display
-        quote_label = CTkLabel(app, text="", wraplength=700, font=("Arial Rounded MT Bold", 25),
-                               anchor="center", justify="center")
-        quote_label.pack(pady=30, expand=True)
-
-        # State tracking
-        state = {'running': False, 'paused': False, 'time_left': duration_minutes * 60}
-
-        # Recursively schedule next quote between 15–30 seconds
-        def schedule_quote():
-            if state['running']:
-                threading.Thread(target=generate_quote, daemon=True).start()
-                delay = random.randint(15000, 30000)
-                app.after(delay, schedule_quote)
-
-        # Update timer every second
-        def update_timer():
-            def tick():
-                if state['time_left'] > 0 and state['running']:
-                    if not state['paused']:
-                        minutes, seconds = divmod(state['time_left'], 60)
-                        time_str = f"{minutes:02}:{seconds:02}"
-                        countdown_label.configure(text=f"Time left: {time_str}")
-                        state['time_left'] -= 1
-                    app.after(1000, tick)
-                elif state['running']:
-                    countdown_label.configure(text="✅ Time’s up!")
-                    state['running'] = False
-            tick()
-
-        # Generate and display a new quote
-        def generate_quote():
-            quote = get_motivational_quote(state['time_left'], duration_minutes)
-            quote_label.configure(text=quote)
-
-        # Start timer logic
-        def start_timer():
-            state['running'] = True
-            threading.Thread(target=update_timer, daemon=True).start()
-            threading.Thread(target=generate_quote, daemon=True).start()
-            schedule_quote()
-
-        # Pause and resume toggle
-        def toggle_pause():
-            state['paused'] = not state['paused']
-            pause_button.configure(text="Resume Timer" if state['paused'] else "Pause Timer")
-
-        # Reset the timer to original duration
-        def reset_timer():
+    # Handle timer duration input
+    def get_duration():
+        try:
+            mins = int(timer_input.get())
+            error_label.configure(text="")
+            start_ai_timer(mins)
+        except ValueError:
+            error_label.configure(text="Please enter a valid number.")
+
+    # Start button with sound and input validation
+    start_button = CTkButton(input_screen, text="Start Timer",
+                             command=lambda: [play_click(), get_duration()],
+                             corner_radius=50, width=250, height=50, font=("Arial Rounded MT Bold", 18))
+    start_button.pack(pady=30)
+    start_button.bind("<Enter>", play_hover)
+
+    # Second screen: countdown and quotes
+    timer_screen = CTkFrame(window, fg_color="transparent")
+
+    # Countdown display
+    countdown_label = CTkLabel(timer_screen, text="Time left: 00:00", font=("Segoe UI", 35))
+    countdown_label.pack(pady=25)
+
+    # Motivational quote display
+    quote_label = CTkLabel(timer_screen, text="", wraplength=700, font=("Arial Rounded MT Bold", 25),
+                           anchor="center", justify="center")
+    quote_label.pack(pady=30, expand=True)
+
+    # The engine owns the countdown; the UI only redraws what it reports
+    engine = TimerEngine(0)
+    state = {'running': False, 'shown': None, 'tick_id': None, 'quote_id': None,
+             'minutes': 0, 'quotes': None}
+
+    # Cancel pending callbacks so a restart never leaves two chains running
+    def cancel_pending():
+        for key in ('tick_id', 'quote_id'):
+            if state[key] is not None:
+                window.after_cancel(state[key])
+                state[key] = None
+
+    # Recursively schedule next quote between 15–30 seconds
+    def schedule_quote():
+        state['quote_id'] = None
+        if state['running']:
+            generate_quote()
+            delay = random.randint(15000, 30000)
+            state['quote_id'] = window.after(delay, schedule_quote)
+
+    # Redraw only when the shown second changes, then sleep until the next second boundary
+    def tick():
+        state['tick_id'] = None
+        if not state['running']:
+            return
+        if engine.finished:
+            countdown_label.configure(text="✅ Time’s up!")
             state['running'] = False
-            app.destroy()
-            start_ai_timer(duration_minutes)
+            return
+        seconds_left = engine.display_seconds()
+        if seconds_left != state['shown']:
+            state['shown'] = seconds_left
+            countdown_label.configure(text=f"Time left: {format_time(seconds_left)}")
+        # Nothing changes while paused, so no wakeups until resume
+        if not engine.paused:
+            state['tick_id'] = window.after(engine.ms_until_next_change(), tick)
+
+    # Display the next buffered quote
+    def generate_quote():
+        quote_label.configure(text=state['quotes'].get(engine.display_seconds()))
+
+    # Start timer logic
+    def start_timer():
+        cancel_pending()
+        state['running'] = True
+        state['shown'] = None
+        engine.start()
+        pause_button.configure(text="Pause Timer")
+        quote_label.configure(text="")
+        state['quotes'].refill(engine.display_seconds())
+        tick()
+        schedule_quote()
+
+    # Switch to the countdown screen and start a session
+    def start_ai_timer(duration_minutes):
+        state['minutes'] = duration_minutes
+        engine.duration = duration_minutes * 60
+        # Quotes are prefetched in batches, so showing one never blocks
+        state['quotes'] = QuoteBuffer(duration_minutes)
+        input_screen.pack_forget()
+        window.geometry("800x600")
+        timer_screen.pack(fill="both", expand=True)
+        start_timer()
 
-        # Start the timer and build UI
+    # Stop the countdown and go back to the duration screen
+    def show_timer_input_screen():
+        state['running'] = False
+        cancel_pending()
+        engine.reset()
+        timer_screen.pack_forget()
+        window.geometry("600x400")
+        input_screen.pack(fill="both", expand=True)
+
+    # Pause and resume toggle
+    def toggle_pause():
+        engine.toggle_pause()
+        pause_button.configure(text="Resume Timer" if engine.paused else "Pause Timer")
+        if state['tick_id'] is not None:
+            window.after_cancel(state['tick_id'])
+            state['tick_id'] = None
+        tick()
+
+    # Reset the timer to original duration, in place
+    def reset_timer():
         start_timer()
-        pause_button = create_button(app, "Pause Timer", toggle_pause)
-        create_button(app, "Reset Timer", reset_timer)
 
-        app.mainloop()
+    pause_button = create_button(timer_screen, "Pause Timer", toggle_pause)
+    create_button(timer_screen, "Reset Timer", reset_timer)
+
+    # Closing the window ends the session; the window itself is kept for reuse
+    window.on_hide = show_timer_input_screen
 
     # Launch the input screen
     show_timer_input_screen()
+    return window
@@ -0,0 +1,218 @@
+# Local stand-in for the Ollama server, for benchmarks and offline testing.
+# Speaks enough of the HTTP API (/api/chat, /api/generate, /api/tags) for the tools,
+# with configurable latency, token rate, streaming and failure injection.
+#
+#   python benchmarks/fake_ollama.py --port 11435 --latency 0.5 --token-rate 40
+#   OLLAMA_HOST=http://127.0.0.1:11435 python main.py
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+WORDS = ("the cell uses energy from light to build sugar while water moves through the roots "
+         "and every step of the process depends on enzymes that speed up reactions").split()
+
+
+# Reply text shaped like what each tool expects, so the parsers have real work to do.
+# structured is set for requests with a format (JSON output).
+def fake_reply(prompt, rng, structured=False):
+    if "flashcards" in prompt:
+        count = 5
+        for word in prompt.split():
+            if word.isdigit():
+                count = int(word)
+                break
+        if structured:
+            # Numbered at random, so a re-request does not repeat the questions it already has
+            cards = [{"question": f"What does step {rng.randrange(1000)} of the process do?",
+                      "answer": f"{' '.join(rng.choice(WORDS) for _ in range(12)).capitalize()}."}
+                     for i in range(1, count + 1)]
+            return json.dumps({"flashcards": cards}, indent=2)
+        lines = []
+        for i in range(1, count + 1):
+            lines.append(f"{i}. What does step {i} of the process do?")
+            lines.append(f"- {' '.join(rng.choice(WORDS) for _ in range(12)).capitalize()}.")
+        return "\n".join(lines)
+    if "motivating sentences" in prompt:
+        return "\n".join(f"{i}. Keep going, you are making progress number {i}." for i in range(1, 11))
+    if "motivating sentence" in prompt:
+        return "Every minute you put in now is building your future."
+    return " ".join(rng.choice(WORDS) for _ in range(120)).capitalize() + "."
+
+
+# Split reply text into token-sized pieces (words plus their trailing whitespace)
+def tokenize(text):
+    tokens = []
+    current = ""
+    for char in text:
+        current += char
+        if char in " \n":
+            tokens.append(current)
+            current = ""
+    if current:
+        tokens.append(current)
+    return tokens
+
+
+class FakeOllamaServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, token_rate=50.0, failure_rate=0.0, seed=None,
+                 prompt_rate=0.0, malformed_rate=0.0):
+        self.latency = latency  # Seconds before the first token (model load, fixed overhead)
+        self.prompt_rate = prompt_rate  # Prompt tokens read per second (0 = free), adds to the wait
+        self.token_rate = token_rate  # Tokens per second once generating (0 = instant)
+        self.failure_rate = failure_rate  # Fraction of requests answered with HTTP 500
+        self.malformed_rate = malformed_rate  # Fraction of JSON replies cut off part way through
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json(200, {"models": [{"name": "phi:latest", "model": "phi:latest"}]})
+                elif self.path == "/api/version":
+                    self._send_json(200, {"version": "0.0.0-fake"})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with fake.rng_lock:
+                    fake.requests += 1
+                    fail = fake.rng.random() < fake.failure_rate
+                    malformed = fake.rng.random() < fake.malformed_rate
+                    rng = random.Random(fake.rng.random())
+
+                if self.path not in ("/api/chat", "/api/generate"):
+                    self._send_json(404, {"error": "not found"})
+                    return
+                wait = fake.latency
+                if fake.prompt_rate:
+                    wait += len(json.dumps(request)) / 4 / fake.prompt_rate
+                time.sleep(wait)
+                if fail:
+                    self._send_json(500, {"error": "injected failure"})
+                    return
+
+                chat = self.path == "/api/chat"
+                if chat:
+                    messages = request.get("messages") or []
+                    prompt = messages[-1].get("content", "") if messages else ""
+                else:
+                    prompt = request.get("prompt", "")
+                # An empty request only loads the model (used for warm-up)
+                structured = bool(request.get("format"))
+                text = fake_reply(prompt, rng, structured) if prompt else ""
+                if structured and malformed:
+                    # Like a reply that hit the length limit: stops in the middle of the JSON
+                    text = text[:int(len(text) * rng.uniform(0.3, 0.9))]
+                tokens = tokenize(text)
+
+                if request.get("stream", True):
+                    self._stream(tokens, request.get("model", "phi"), chat)
+                else:
+                    if fake.token_rate:
+                        time.sleep(len(tokens) / fake.token_rate)
+                    self._send_json(200, self._message(request.get("model", "phi"), text, chat, True, len(tokens)))
+
+            def _message(self, model, content, chat, done, eval_count=0):
+                body = {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": done}
+                if chat:
+                    body["message"] = {"role": "assistant", "content": content}
+                else:
+                    body["response"] = content
+                if done:
+                    body.update({"done_reason": "stop", "eval_count": eval_count,
+                                 "eval_duration": int(eval_count / fake.token_rate * 1e9) if fake.token_rate else 0})
+                return body
+
+            def _send_json(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            # NDJSON stream, one line per token, like the real server
+            def _stream(self, tokens, model, chat):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        if fake.token_rate:
+                            time.sleep(1 / fake.token_rate)
+                        self._chunk(self._message(model, token, chat, False))
+                    self._chunk(self._message(model, "", chat, True, len(tokens)))
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client stopped reading (cancelled request)
+
+            def _chunk(self, body):
+                data = (json.dumps(body) + "\n").encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=50.0, help="tokens per second (0 = instant)")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--prompt-rate", type=float, default=0.0, help="prompt tokens read per second (0 = free)")
+    parser.add_argument("--malformed-rate", type=float, default=0.0,
+                        help="fraction of JSON replies cut off part way through")
+    args = parser.parse_args()
+
+    server = FakeOllamaServer(args.host, args.port, args.latency, args.token_rate, args.failure_rate,
+                              prompt_rate=args.prompt_rate, malformed_rate=args.malformed_rate)
+    print(f"Fake Ollama listening on {server.url} (set OLLAMA_HOST to use it)")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+# Offline benchmark suite: runs the tools' model paths headlessly against the fake
+# Ollama server and reports latency percentiles, time to first token, throughput
+# under concurrency and parser speed. Results are saved as JSON for comparing commits.
+#
+#   python benchmarks/run_benchmarks.py --json before.json
+#   python benchmarks/run_benchmarks.py --json after.json --compare before.json
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_ollama import FakeOllamaServer  # noqa: E402  (same folder)
+
+ARTICLE = (
+    "Photosynthesis is the process plants use to turn light into chemical energy. "
+    "It takes place in the chloroplasts, mostly in the leaves. Water is taken up by the roots "
+    "and carbon dioxide enters through small openings called stomata. "
+) * 6
+
+
+# p50/p95/mean of a list of seconds, in milliseconds
+def percentiles(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+        "mean_ms": round(statistics.mean(ordered) * 1000, 1),
+    }
+
+
+# Run fn(i) for i in range(n) on `concurrency` threads; returns latencies, errors and wall time
+def run_load(fn, n, concurrency):
+    latencies = []
+    errors = 0
+
+    def timed(i):
+        start = time.perf_counter()
+        ok = fn(i)
+        return time.perf_counter() - start, ok
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, ok in pool.map(timed, range(n)):
+            if ok:
+                latencies.append(latency)
+            else:
+                errors += 1
+    return latencies, errors, time.perf_counter() - start
+
+
+# generate_flashcards + parse_flashcards, the Flashcards button's model path
+# (optionally with the article compressed first)
+def bench_flashcards(n, concurrency, compression=None):
+    import flashcards
+
+    def one(i):
+        # A different article each time, so the response cache never answers
+        text = f"{ARTICLE} (run {i} {time.time()})"
+        if compression:
+            text = flashcards.compress_article(text, compression)
+        raw = flashcards.generate_flashcards(text)
+        return not raw.startswith("ERROR") and bool(flashcards.parse_flashcards(raw))
+
+    latencies, errors, wall = run_load(one, n, concurrency)
+    result = percentiles(latencies)
+    result.update({"errors": errors, "concurrency": concurrency,
+                   "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0})
+    return result
+
+
+# The Concept Explainer's streaming fetch path: time to first token and total time
+def bench_explainer(n, concurrency):
+    import ai_concept_explainer
+
+    first_tokens = []
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            first = True
+            for _ in ai_concept_explainer.stream_concept_explanation(f"photosynthesis #{i} {time.time()}"):
+                if first:
+                    first_tokens.append(time.perf_counter() - start)
+                    first = False
+        except Exception:
+            return False
+        return True
+
+    latencies, errors, wall = run_load(one, n, concurrency)
+    result = percentiles(latencies)
+    result["ttft"] = percentiles(first_tokens)
+    result.update({"errors": errors, "concurrency": concurrency,
+                   "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0})
+    return result
+
+
+# Reworded repeats of a few questions, which the semantic cache should answer
+REWORDED = [
+    ("what is photosynthesis", "explain photosynthesis simply", "Photosynthesis?"),
+    ("what is the pythagorean theorem", "explain the Pythagorean theorem", "define pythagorean theorem"),
+    ("what is osmosis", "osmosis explained", "please explain osmosis"),
+]
+
+
+def bench_explainer_reworded(n):
+    import ai_concept_explainer
+    from semantic_cache import get_semantic_cache
+
+    def one(i):
+        group = REWORDED[i % len(REWORDED)]
+        try:
+            "".join(ai_concept_explainer.stream_concept_explanation(group[(i // len(REWORDED)) % len(group)]))
+        except Exception:
+            return False
+        return True
+
+    # One client at a time, so each first wording is answered before its rewordings come in
+    hits_before = get_semantic_cache().stats()["hits"]
+    latencies, errors, _ = run_load(one, n, 1)
+    result = percentiles(latencies)
+    result.update({"errors": errors,
+                   "semantic_hit_rate": round((get_semantic_cache().stats()["hits"] - hits_before) / n, 3)})
+    return result
+
+
+# generate_flashcards_structured, the Flashcards button's JSON model path. With the
+# fake server cutting off some replies, shows how often the salvage still gives a full set.
+def bench_flashcards_structured(n, concurrency, num_cards=5):
+    import flashcards
+    complete = []
+
+    def one(i):
+        text = f"{ARTICLE} (run {i} {time.time()})"
+        cards, errors = flashcards.generate_flashcards_structured(text, num_cards)
+        complete.append(len(cards) == num_cards)
+        return bool(cards) and not errors
+
+    latencies, errors, wall = run_load(one, n, concurrency)
+    result = percentiles(latencies)
+    result.update({"errors": errors, "concurrency": concurrency,
+                   "complete_rate": round(sum(complete) / len(complete), 3) if complete else 0.0,
+                   "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0})
+    return result
+
+
+# get_motivational_quotes, the batch call behind the AI Timer's QuoteBuffer
+# (an empty batch is what the buffer replaces with fallback quotes)
+def bench_quotes(n, concurrency):
+    import ai_timer
+    counts = []
+
+    def one(i):
+        quotes = ai_timer.get_motivational_quotes(1500 - i, 25)
+        counts.append(len(quotes))
+        return bool(quotes)
+
+    latencies, failed, wall = run_load(one, n, concurrency)
+    result = percentiles(latencies)
+    result.update({"failed_batches": failed, "concurrency": concurrency,
+                   "quotes_per_call": round(statistics.mean(counts), 2) if counts else 0.0})
+    return result
+
+
+# parse_flashcards on a large synthetic model output, in lines per second
+def bench_parser(cards):
+    import flashcards
+
+    lines = []
+    for i in range(1, cards + 1):
+        lines.append(f"{i}. What is fact number {i} about the topic?")
+        lines.append(f"- It is the {i}th fact, and it matters because of several reasons.")
+        lines.append("- A second answer line that continues the explanation.")
+    raw = "\n".join(lines)
+
+    runs = []
+    for _ in range(3):
+        start = time.perf_counter()
+        parsed = flashcards.parse_flashcards(raw)
+        runs.append(time.perf_counter() - start)
+    assert len(parsed) == cards
+    best = min(runs)
+    return {"lines": len(lines), "seconds": round(best, 4), "lines_per_sec": round(len(lines) / best)}
+
+
+# Percentage change of every numeric metric against an earlier results file
+def compare(current, previous, prefix=""):
+    for key, value in current.items():
+        old = previous.get(key) if isinstance(previous, dict) else None
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            compare(value, old or {}, name + ".")
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            change = (value - old) / old * 100
+            print(f"  {name:<40} {old:>12} -> {value:<12} ({change:+.1f}%)")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the tools against a local fake Ollama server.")
+    parser.add_argument("--requests", type=int, default=20, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads sending requests")
+    parser.add_argument("--server-parallel", type=int, default=2, help="requests the client runs at once")
+    parser.add_argument("--latency", type=float, default=0.05, help="fake server seconds before first token")
+    parser.add_argument("--token-rate", type=float, default=500.0, help="fake server tokens per second")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of failed requests")
+    parser.add_argument("--prompt-rate", type=float, default=2000.0, help="fake server prompt tokens per second")
+    parser.add_argument("--malformed-rate", type=float, default=0.2, help="fraction of cut-off JSON replies")
+    parser.add_argument("--compression", type=float, default=0.3, help="ratio for the compressed flashcards run")
+    parser.add_argument("--parser-cards", type=int, default=50000, help="cards in the parser benchmark")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    with FakeOllamaServer(latency=args.latency, token_rate=args.token_rate,
+                          failure_rate=args.failure_rate, seed=1, prompt_rate=args.prompt_rate,
+                          malformed_rate=args.malformed_rate) as server:
+        # Must be set before the tools import llm; a throwaway cache keeps runs independent
+        os.environ["OLLAMA_HOST"] = server.url
+        os.environ["OLLAMA_NUM_PARALLEL"] = str(args.server_parallel)
+        scratch = tempfile.mkdtemp()
+        os.environ["AI_TOOLKIT_CACHE"] = os.path.join(scratch, "bench_cache.sqlite3")
+        os.environ["AI_TOOLKIT_SEMANTIC_CACHE"] = os.path.join(scratch, "bench_semantic.sqlite3")
+        os.environ.setdefault("AI_TOOLKIT_METRICS", os.path.join(scratch, "metrics.jsonl"))
+
+        results = {
+            "flashcards": bench_flashcards(args.requests, args.concurrency),
+            "flashcards_compressed": bench_flashcards(args.requests, args.concurrency, args.compression),
+            "flashcards_structured": bench_flashcards_structured(args.requests, args.concurrency),
+            "explainer": bench_explainer(args.requests, args.concurrency),
+            "explainer_reworded": bench_explainer_reworded(args.requests),
+            "quotes": bench_quotes(args.requests, args.concurrency),
+            "parser": bench_parser(args.parser_cards),
+        }
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": vars(args),
+        "results": results,
+    }
+    print(json.dumps(results, indent=2))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+        print(f"\nCompared with {previous.get('commit') or args.compare}:")
+        compare(results, previous.get("results", {}))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Startup benchmark: import time of each module and time until the launcher window is drawn.
+# Every measurement runs in a fresh interpreter so nothing is already imported or cached.
+#
+#   python benchmarks/startup.py [--runs 5] [--json results.json]
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Project root, the scripts load their sound files relative to it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules to time on their own
+MODULES = ["main", "flashcards", "ai_concept_explainer", "ai_timer"]
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+# Builds the launcher the same way main.py does and reports once the first frame is drawn
+WINDOW_SNIPPET = """
+import time
+import main
+from customtkinter import CTk, set_default_color_theme
+root = CTk()
+root.configure(fg_color="#282c3f")
+set_default_color_theme("dark-blue")
+app = main.ResponsiveApp(root)
+root.update()
+print(time.time())
+root.destroy()
+"""
+
+
+# Run a snippet in a new interpreter and return the last line it printed as a float
+def run_snippet(code):
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+# Seconds to import a module in a fresh interpreter
+def time_import(module):
+    return run_snippet(IMPORT_SNIPPET.format(module=module))
+
+
+# Seconds from launching the interpreter to the first drawn launcher window
+def time_first_window():
+    start = time.time()
+    return run_snippet(WINDOW_SNIPPET) - start
+
+
+# Median and spread of a list of timings, in milliseconds
+def summarize(samples):
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "min_ms": round(min(samples) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure launcher import time and time to first window.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--no-window", action="store_true", help="skip the window test (no display available)")
+    args = parser.parse_args()
+
+    results = {"imports": {}}
+    for module in MODULES:
+        results["imports"][module] = summarize([time_import(module) for _ in range(args.runs)])
+        print(f"import {module:<22} {results['imports'][module]['median_ms']:>8.1f} ms")
+
+    if not args.no_window:
+        results["first_window"] = summarize([time_first_window() for _ in range(args.runs)])
+        print(f"{'first window':<29} {results['first_window']['median_ms']:>8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
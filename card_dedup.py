@@ -0,0 +1,157 @@
+import re
+import zlib
+import numpy as np
+
+# Cards whose estimated Jaccard similarity (over word shingles) reaches this are duplicates
+DEDUP_THRESHOLD = 0.5
+# MinHash signature length; more is more accurate and slower
+NUM_PERM = 128
+# Cards hashed together in one NumPy batch (bounds memory to a few tens of MB)
+BATCH_CARDS = 500
+SEED = 1
+
+STOP_WORDS = set("""
+a an and are as at be been but by can could did do does for from had has have how i if in into is it its
+may of on or so such than that the their them then there these they this those to was were what when where
+which while who why will with would you your
+""".split())
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def card_text(card):
+    return f"{card['question']} {card['answer']}"
+
+
+# Content words plus neighbouring pairs, hashed to 32-bit ints. Plural "s" is dropped
+# so small rewordings still share shingles. Never empty, so every card gets a signature.
+def shingles(text):
+    words = [w[:-1] if len(w) > 3 and w.endswith("s") else w
+             for w in WORD_RE.findall(text.lower()) if w not in STOP_WORDS]
+    grams = set(words)
+    grams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    if not grams:
+        grams = {text.strip().lower()}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+# MinHash signatures: for each of num_perm random hash functions, the smallest hash
+# of any shingle. Two cards agree on a position with probability equal to their Jaccard similarity.
+# The hash functions are multiply-shift ((a * x + b) mod 2**64, top 32 bits), which needs
+# no division and so keeps the big batch multiplications cheap.
+class MinHasher:
+    def __init__(self, num_perm=NUM_PERM, seed=SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * 2 + 1  # Odd multipliers
+        self.b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    # One (len(texts), num_perm) uint32 matrix; all shingles of a batch are hashed at once
+    def signatures(self, texts):
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        for start in range(0, len(texts), BATCH_CARDS):
+            sets = [shingles(text) for text in texts[start:start + BATCH_CARDS]]
+            offsets = np.cumsum([0] + [len(s) for s in sets[:-1]])
+            hashed = (self.a * np.concatenate(sets) + self.b) >> np.uint64(32)
+            result[start:start + len(sets)] = np.minimum.reduceat(hashed, offsets, axis=1).T
+        return result
+
+    def signature(self, text):
+        return self.signatures([text])[0]
+
+
+# Bands x rows split of the signature whose LSH threshold, (1 / bands) ** (1 / rows),
+# is closest to the similarity threshold
+def choose_bands(threshold, num_perm=NUM_PERM):
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+# Locality-sensitive hash index over MinHash signatures. Each signature is cut into
+# bands, and only entries sharing a whole band with a query are compared, so lookups
+# stay near constant time instead of scanning every card.
+class LSHIndex:
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM):
+        self.threshold = threshold
+        self.bands, self.rows = choose_bands(threshold, num_perm)
+        rng = np.random.default_rng(SEED)
+        self.band_weights = rng.integers(1, 1 << 62, size=self.rows, dtype=np.uint64)
+        self.buckets = [{} for _ in range(self.bands)]
+        self.signatures = {}
+        self.keys = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    # One 64-bit bucket key per band for each row of a signature matrix (vectorised,
+    # wrapping arithmetic; a rare collision only costs an extra comparison)
+    def band_keys(self, signatures):
+        banded = signatures[:, :self.bands * self.rows].reshape(len(signatures), self.bands, self.rows)
+        return (banded.astype(np.uint64) * self.band_weights).sum(axis=2).tolist()
+
+    def add(self, key, signature, band_keys=None):
+        if band_keys is None:
+            band_keys = self.band_keys(signature[None, :])[0]
+        self.signatures[key] = signature
+        self.keys[key] = band_keys
+        for bucket, band_key in zip(self.buckets, band_keys):
+            bucket.setdefault(band_key, []).append(key)
+
+    def remove(self, key):
+        self.signatures.pop(key, None)
+        for bucket, band_key in zip(self.buckets, self.keys.pop(key, ())):
+            entries = bucket.get(band_key)
+            if entries is not None and key in entries:
+                entries.remove(key)
+                if not entries:
+                    del bucket[band_key]
+
+    # Key of the most similar indexed entry at or above the threshold, or None
+    def match(self, signature, band_keys=None):
+        if band_keys is None:
+            band_keys = self.band_keys(signature[None, :])[0]
+        candidates = set()
+        for bucket, band_key in zip(self.buckets, band_keys):
+            candidates.update(bucket.get(band_key, ()))
+        best = None
+        best_similarity = self.threshold
+        for key in candidates:
+            similarity = np.count_nonzero(self.signatures[key] == signature) / len(signature)
+            if similarity >= best_similarity:
+                best, best_similarity = key, similarity
+        return best
+
+
+# Filters a stream of cards (e.g. chunk after chunk) down to the ones not seen before.
+# The first card of a duplicate group is kept; when a later duplicate has a longer
+# answer, that answer replaces the kept one's if it has not been handed out yet.
+class CardDeduper:
+    def __init__(self, threshold=DEDUP_THRESHOLD, hasher=None):
+        self.hasher = hasher or MinHasher()
+        self.index = LSHIndex(threshold, self.hasher.num_perm)
+        self.kept = []
+        self.dropped = 0
+
+    # The cards of this batch that are not near-duplicates of earlier ones
+    def filter(self, cards):
+        fresh = []
+        fresh_keys = set()
+        signatures = self.hasher.signatures([card_text(card) for card in cards])
+        for card, signature, band_keys in zip(cards, signatures, self.index.band_keys(signatures)):
+            match = self.index.match(signature, band_keys)
+            if match is None:
+                fresh_keys.add(len(self.kept))
+                self.index.add(len(self.kept), signature, band_keys)
+                self.kept.append(card)
+                fresh.append(card)
+                continue
+            self.dropped += 1
+            kept = self.kept[match]
+            if match in fresh_keys and len(card['answer']) > len(kept['answer']):
+                kept['answer'] = card['answer']
+        return fresh
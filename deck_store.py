@@ -0,0 +1,393 @@
+import os
+import time
+import heapq
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# Default location of the deck database (next to the scripts, can be overridden)
+DECKS_PATH = os.environ.get(
+    "AI_TOOLKIT_DECKS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "decks.sqlite3")
+)
+# Cards read from the database at a time
+PAGE_SIZE = 50
+# SM-2 starting ease and the lowest it may fall to
+START_EASE = 2.5
+MIN_EASE = 1.3
+# A forgotten card comes back after this many seconds, within the same session
+RELEARN_SECONDS = 10 * 60
+DAY_SECONDS = 24 * 60 * 60
+# New cards this similar to a stored card (in any deck) are not saved again; None saves everything
+DEDUP_THRESHOLD = 0.5
+# Stored cards read (and given signatures) at a time while the dedupe index is built
+INDEX_PAGE = 2000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decks (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    source TEXT,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    deck_id INTEGER NOT NULL REFERENCES decks (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    due REAL NOT NULL,
+    interval REAL NOT NULL DEFAULT 0,
+    ease REAL NOT NULL DEFAULT 2.5,
+    reps INTEGER NOT NULL DEFAULT 0,
+    lapses INTEGER NOT NULL DEFAULT 0,
+    signature BLOB
+);
+CREATE INDEX IF NOT EXISTS cards_deck_position ON cards (deck_id, position);
+CREATE INDEX IF NOT EXISTS cards_due ON cards (due, id);
+CREATE INDEX IF NOT EXISTS cards_deck_due ON cards (deck_id, due, id);
+CREATE TABLE IF NOT EXISTS card_tags (
+    tag TEXT NOT NULL,
+    card_id INTEGER NOT NULL REFERENCES cards (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, card_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS card_tags_card ON card_tags (card_id);
+"""
+
+CARD_COLUMNS = "id, deck_id, position, question, answer, due, interval, ease, reps, lapses"
+
+
+def _card(row):
+    return dict(zip(("id", "deck_id", "position", "question", "answer",
+                     "due", "interval", "ease", "reps", "lapses"), row))
+
+
+# SQLite store for flashcard decks and their review schedule
+class DeckStore:
+    def __init__(self, path=DECKS_PATH):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        # Databases from before near-duplicate detection have no signature column yet
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(cards)")]
+        if "signature" not in columns:
+            self.conn.execute("ALTER TABLE cards ADD COLUMN signature BLOB")
+        self.conn.commit()
+        self.dedup_lock = threading.Lock()
+        self.hasher = None
+        self.index = None
+        self.deleted = []  # Ids of deleted cards still in the dedupe index
+
+    # Save cards into a deck (created if new, appended to if it exists). Cards that are
+    # near-duplicates of a stored card, or of an earlier card in the same call, are skipped;
+    # pass dedupe_threshold=None to keep them all. Returns (deck_id, dropped): deck_id is
+    # None when no card was left to save and the deck did not exist, so no empty deck is made.
+    # Signatures and the index are worked out under dedup_lock only; self.lock (which the
+    # Review window's queries wait on) is held just for short reads and the INSERTs.
+    def add_deck(self, name, cards, tags=(), source=None, dedupe_threshold=DEDUP_THRESHOLD):
+        now = time.time()
+        with self.dedup_lock:
+            signatures = self._signatures(cards) if dedupe_threshold is not None and cards else None
+            index = self._dedupe_index(dedupe_threshold) if signatures is not None else None
+            if index is None:
+                self.index = None  # These cards get no signature now, so rebuild the index next time
+            band_keys = index.band_keys(signatures) if index is not None else None
+
+            # Only cards that are not already stored, nor repeats of an earlier card of this call
+            keep = []
+            dropped = 0
+            if index is not None:
+                from card_dedup import LSHIndex
+                batch = LSHIndex(dedupe_threshold, self.hasher.num_perm)
+                for i in range(len(cards)):
+                    if (index.match(signatures[i], band_keys[i]) is None
+                            and batch.match(signatures[i], band_keys[i]) is None):
+                        batch.add(i, signatures[i], band_keys[i])
+                        keep.append(i)
+                    else:
+                        dropped += 1
+            else:
+                keep = list(range(len(cards)))
+
+            with self.lock:
+                if not keep:
+                    row = self.conn.execute("SELECT id FROM decks WHERE name = ?", (name,)).fetchone()
+                    return (row[0] if row else None), dropped
+                self.conn.execute("INSERT OR IGNORE INTO decks (name, source, created) VALUES (?, ?, ?)",
+                                  (name, source, now))
+                deck_id = self.conn.execute("SELECT id FROM decks WHERE name = ?", (name,)).fetchone()[0]
+                position = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM cards WHERE deck_id = ?",
+                                             (deck_id,)).fetchone()[0]
+                added = []
+                for i in keep:
+                    card = cards[i]
+                    # New cards are due right away
+                    cursor = self.conn.execute(
+                        "INSERT INTO cards (deck_id, position, question, answer, due, ease, signature) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (deck_id, position, card['question'], card['answer'], now, START_EASE,
+                         None if index is None else signatures[i].tobytes())
+                    )
+                    position += 1
+                    added.append((cursor.lastrowid, i))
+                    self.conn.executemany("INSERT OR IGNORE INTO card_tags (tag, card_id) VALUES (?, ?)",
+                                          [(tag, cursor.lastrowid) for tag in tags])
+                self.conn.commit()
+                # A deck deleted since the index was checked can have its ids reused by these
+                # cards; its stale entries go now rather than taking the new cards with them later
+                reused = set(self.deleted).intersection(card_id for card_id, _ in added)
+                if reused:
+                    self.deleted = [card_id for card_id in self.deleted if card_id not in reused]
+            if index is not None:
+                for card_id in reused:
+                    index.remove(card_id)
+                for card_id, i in added:
+                    index.add(card_id, signatures[i], band_keys[i])
+        return deck_id, dropped
+
+    # MinHash signatures of cards (NumPy is only loaded once deduplication is used)
+    def _signatures(self, cards):
+        from card_dedup import MinHasher, card_text
+        if self.hasher is None:
+            self.hasher = MinHasher()
+        return self.hasher.signatures([card_text(card) for card in cards])
+
+    # LSH index of every stored card, built on first use. Saved signatures are reused,
+    # and cards stored without one get it computed and saved now. Cards are read and
+    # signatures saved a page at a time, so self.lock is never held for long; cards
+    # deleted meanwhile are taken out once the index is ready. Caller holds dedup_lock.
+    def _dedupe_index(self, threshold):
+        import numpy as np
+        from card_dedup import LSHIndex
+        if self.index is None or self.index.threshold != threshold:
+            index = LSHIndex(threshold, self.hasher.num_perm)
+            size = self.hasher.num_perm * 4
+            last_id = -1
+            with self.lock:
+                self.deleted = []  # Only deletions from here on can be missed by the pages below
+            while True:
+                with self.lock:
+                    rows = self.conn.execute(
+                        "SELECT id, question, answer, signature FROM cards WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, INDEX_PAGE)
+                    ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                stale = [row for row in rows if row[3] is None or len(row[3]) != size]
+                computed = {}
+                if stale:
+                    fresh = self._signatures([{"question": row[1], "answer": row[2]} for row in stale])
+                    with self.lock:
+                        self.conn.executemany("UPDATE cards SET signature = ? WHERE id = ?",
+                                              [(signature.tobytes(), row[0]) for row, signature in zip(stale, fresh)])
+                        self.conn.commit()
+                    computed = {row[0]: signature for row, signature in zip(stale, fresh)}
+                matrix = np.stack([computed[row[0]] if row[0] in computed else np.frombuffer(row[3], dtype=np.uint32)
+                                   for row in rows])
+                for row, signature, keys in zip(rows, matrix, index.band_keys(matrix)):
+                    index.add(row[0], signature, keys)
+            self.index = index
+        with self.lock:
+            deleted, self.deleted = self.deleted, []
+        for card_id in deleted:
+            self.index.remove(card_id)
+        return self.index
+
+    # All decks with their card count and how many are due
+    def list_decks(self, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT d.id, d.name, COUNT(c.id), COALESCE(SUM(c.due <= ?), 0) "
+                "FROM decks d LEFT JOIN cards c ON c.deck_id = d.id GROUP BY d.id ORDER BY d.created DESC",
+                (now,)
+            ).fetchall()
+        return [{"id": r[0], "name": r[1], "cards": r[2], "due": r[3]} for r in rows]
+
+    def delete_deck(self, deck_id):
+        with self.lock:
+            # The dedupe index drops these cards before its next use (it is only touched under dedup_lock)
+            self.deleted.extend(card_id for (card_id,) in
+                                self.conn.execute("SELECT id FROM cards WHERE deck_id = ?", (deck_id,)))
+            self.conn.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+            self.conn.commit()
+
+    def count_cards(self, deck_id):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM cards WHERE deck_id = ?", (deck_id,)).fetchone()[0]
+
+    # One page of a deck in its original order
+    def page_cards(self, deck_id, offset, limit=PAGE_SIZE):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {CARD_COLUMNS} FROM cards WHERE deck_id = ? ORDER BY position LIMIT ? OFFSET ?",
+                (deck_id, limit, offset)
+            ).fetchall()
+        return [_card(row) for row in rows]
+
+    # Cards tagged with tag, in id order
+    def cards_with_tag(self, tag, offset=0, limit=PAGE_SIZE):
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {CARD_COLUMNS} FROM cards WHERE id IN "
+                f"(SELECT card_id FROM card_tags WHERE tag = ?) ORDER BY id LIMIT ? OFFSET ?",
+                (tag, limit, offset)
+            ).fetchall()
+        return [_card(row) for row in rows]
+
+    # Next page of cards in (due, id) order after the given key. The rest of the cursor's due
+    # time and the later due times are two index seeks: a single (due, id) > (?, ?) only seeks
+    # on due, and a deck saved in one go shares one due time, so that scanned up to the cursor.
+    def cards_by_due(self, after=(float("-inf"), -1), limit=PAGE_SIZE, deck_id=None, tag=None):
+        where = ""
+        params = []
+        if deck_id is not None:
+            where += " AND deck_id = ?"
+            params.append(deck_id)
+        if tag is not None:
+            where += " AND id IN (SELECT card_id FROM card_tags WHERE tag = ?)"
+            params.append(tag)
+        query = (f"SELECT * FROM (SELECT {CARD_COLUMNS} FROM cards WHERE due = ? AND id > ?{where} ORDER BY id LIMIT ?) "
+                 f"UNION ALL SELECT * FROM (SELECT {CARD_COLUMNS} FROM cards WHERE due > ?{where} "
+                 f"ORDER BY due, id LIMIT ?) ORDER BY due, id LIMIT ?")
+        with self.lock:
+            rows = self.conn.execute(query, [after[0], after[1], *params, limit,
+                                             after[0], *params, limit, limit]).fetchall()
+        return [_card(row) for row in rows]
+
+    # Save a card's new schedule after a review
+    def update_schedule(self, card):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE cards SET due = ?, interval = ?, ease = ?, reps = ?, lapses = ? WHERE id = ?",
+                (card['due'], card['interval'], card['ease'], card['reps'], card['lapses'], card['id'])
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# SM-2: update a card's schedule from a recall quality of 0 (forgot) to 5 (perfect)
+def sm2(card, quality, now=None):
+    now = time.time() if now is None else now
+    card = dict(card)
+    if quality < 3:
+        card['reps'] = 0
+        card['lapses'] += 1
+        card['interval'] = 0
+        card['due'] = now + RELEARN_SECONDS
+    else:
+        if card['reps'] == 0:
+            card['interval'] = 1
+        elif card['reps'] == 1:
+            card['interval'] = 6
+        else:
+            card['interval'] = round(card['interval'] * card['ease'], 2)
+        card['reps'] += 1
+        card['due'] = now + card['interval'] * DAY_SECONDS
+    card['ease'] = max(MIN_EASE, card['ease'] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return card
+
+
+# Priority queue of cards by due time. Cards are paged in from the database in due
+# order, so memory stays at about one page, and picking the next card is O(log n)
+# no matter how many cards the store holds.
+class ReviewQueue:
+    def __init__(self, store, deck_id=None, tag=None, page_size=PAGE_SIZE):
+        self.store = store
+        self.deck_id = deck_id
+        self.tag = tag
+        self.page_size = page_size
+        self.heap = []
+        self.cursor = (float("-inf"), -1)  # (due, id) of the last card paged in
+        self.exhausted = False
+
+    # Page in more cards once the heap runs low
+    def _fill(self):
+        if self.exhausted or len(self.heap) > self.page_size // 2:
+            return
+        cards = self.store.cards_by_due(self.cursor, self.page_size, self.deck_id, self.tag)
+        if len(cards) < self.page_size:
+            self.exhausted = True
+        for card in cards:
+            heapq.heappush(self.heap, (card['due'], card['id'], card))
+        if cards:
+            self.cursor = (cards[-1]['due'], cards[-1]['id'])
+
+    # The most overdue card, or None if nothing is due yet
+    def next_card(self, now=None):
+        now = time.time() if now is None else now
+        self._fill()
+        if self.heap and self.heap[0][0] <= now:
+            return self.heap[0][2]
+        return None
+
+    # Seconds until the next card is due (None if there are no cards at all)
+    def seconds_until_next(self, now=None):
+        now = time.time() if now is None else now
+        self._fill()
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - now)
+
+    # Grade the card at the front of the queue and reschedule it
+    def review(self, quality, now=None):
+        _, _, card = heapq.heappop(self.heap)
+        card = sm2(card, quality, now)
+        self.store.update_schedule(card)
+        # Cards rescheduled past the cursor will be paged in again from the database;
+        # ones landing before it (forgotten cards) go straight back on the heap
+        if (card['due'], card['id']) <= self.cursor:
+            heapq.heappush(self.heap, (card['due'], card['id'], card))
+        else:
+            self.exhausted = False
+        return card
+
+
+# Read-only, list-like view of a stored deck that loads pages on demand and keeps
+# only a few of them in memory, so the viewer can open decks of any size
+class PagedDeck:
+    def __init__(self, store, deck_id, page_size=PAGE_SIZE, max_pages=4):
+        self.store = store
+        self.deck_id = deck_id
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.pages = OrderedDict()
+        self.length = store.count_cards(deck_id)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError(index)
+        page_number, offset = divmod(index, self.page_size)
+        page = self.pages.get(page_number)
+        if page is None:
+            page = self.store.page_cards(self.deck_id, page_number * self.page_size, self.page_size)
+            self.pages[page_number] = page
+            if len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page_number)
+        return page[offset]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# Process-wide deck store, opened on first use
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DeckStore()
+        return _store
@@ -0,0 +1,129 @@
+# Headless flashcard generation for a whole folder of articles (.txt, .md, .pdf), no window needed.
+# Writes one JSON line per article as soon as it is done, and skips articles that
+# already have a line in the output file, so an interrupted run can be resumed.
+#
+#   python flashcard_batch.py course_notes/ -o decks.jsonl --jobs 2
+#   python flashcard_batch.py "chapters/*.txt" -o decks.jsonl
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import llm
+from ingest import open_article, ARTICLE_EXTENSIONS
+from flashcards import generate_flashcards_chunked, CARDS_PER_CHUNK, CHUNK_CHARS, DEDUP_THRESHOLD, STRUCTURED_OUTPUT
+
+
+# Expand directories (all article files inside, recursively) and glob patterns into a sorted file list
+def find_articles(inputs):
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for extension in ARTICLE_EXTENSIONS:
+                paths.update(glob.glob(os.path.join(item, "**", "*" + extension), recursive=True))
+        else:
+            paths.update(p for p in glob.glob(item, recursive=True) if os.path.isfile(p))
+    return sorted(os.path.abspath(p) for p in paths)
+
+
+# Sources already written to the output file. A half-written last line is ignored, and
+# so is a deck that recorded chunk errors, so those articles are generated again.
+def load_finished(output_path):
+    finished = set()
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                deck = json.loads(line)
+                if not deck.get("errors"):
+                    finished.add(deck["source"])
+            except (ValueError, KeyError, AttributeError):
+                continue
+    return finished
+
+
+# Generate the deck for one article; runs on a worker thread
+def build_deck(path, cards_per_chunk, chunk_chars, compression=None, dedupe_threshold=DEDUP_THRESHOLD,
+               structured=STRUCTURED_OUTPUT):
+    start = time.perf_counter()
+    # The file is read as it is chunked, never all at once.
+    # Chunks of one file go through one at a time, the files themselves run in parallel
+    cards, errors = generate_flashcards_chunked(open_article(path), cards_per_chunk, max_workers=1, max_chars=chunk_chars,
+                                                compression=compression, dedupe_threshold=dedupe_threshold,
+                                                structured=structured)
+    return {
+        "source": path,
+        "cards": cards,
+        "errors": errors,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate flashcard decks for many articles without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="directories of .txt/.md/.pdf files and/or glob patterns")
+    parser.add_argument("-o", "--output", default="flashcards.jsonl", help="JSONL file to append decks to")
+    parser.add_argument("-j", "--jobs", type=int, default=max(2, llm.MAX_CONCURRENT),
+                        help="articles processed at the same time (the server still runs at most "
+                             "OLLAMA_NUM_PARALLEL requests at once)")
+    parser.add_argument("--cards-per-chunk", type=int, default=CARDS_PER_CHUNK)
+    parser.add_argument("--chunk-chars", type=int, default=CHUNK_CHARS)
+    parser.add_argument("--compress", type=float, metavar="RATIO",
+                        help="send only the most informative sentences, about RATIO of the text (e.g. 0.3)")
+    parser.add_argument("--dedupe", type=float, default=DEDUP_THRESHOLD, metavar="THRESHOLD",
+                        help="drop cards at least this similar (0-1) to an earlier card of the same deck; "
+                             "0 keeps every card")
+    parser.add_argument("--format", choices=("json", "text"), default="json" if STRUCTURED_OUTPUT else "text",
+                        help="ask for cards as schema-checked JSON or as numbered lines "
+                             "(JSON falls back to lines on Ollama before 0.5)")
+    args = parser.parse_args(argv)
+    dedupe_threshold = args.dedupe or None
+
+    articles = find_articles(args.inputs)
+    finished = load_finished(args.output)
+    todo = [path for path in articles if path not in finished]
+    print(f"{len(articles)} articles found, {len(articles) - len(todo)} already done, {len(todo)} to go",
+          file=sys.stderr)
+
+    done = 0
+    failed = 0
+    total_cards = 0
+    start = time.perf_counter()
+    with open(args.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {pool.submit(build_deck, path, args.cards_per_chunk, args.chunk_chars, args.compress,
+                               dedupe_threshold, args.format == "json"): path
+                   for path in todo}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                deck = future.result()
+            except Exception as e:
+                deck = {"source": path, "cards": [], "errors": [f"ERROR: {e}"]}
+
+            # Failed articles, including ones where only some chunks failed, are not
+            # written, so the next run retries them
+            if deck["errors"] or not deck["cards"]:
+                failed += 1
+                reason = deck["errors"][0] if deck["errors"] else "no flashcards parsed"
+                print(f"FAILED {path}: {reason}", file=sys.stderr)
+                continue
+
+            out.write(json.dumps(deck, ensure_ascii=False) + "\n")
+            out.flush()
+            done += 1
+            total_cards += len(deck["cards"])
+            print(f"[{done + failed}/{len(todo)}] {len(deck['cards'])} cards  {path}", file=sys.stderr)
+
+    minutes = (time.perf_counter() - start) / 60
+    files_per_min = done / minutes if minutes else 0.0
+    cards_per_min = total_cards / minutes if minutes else 0.0
+    print(f"Done: {done} files, {failed} failed, {total_cards} cards in {minutes * 60:.1f}s "
+          f"({files_per_min:.1f} files/min, {cards_per_min:.1f} cards/min)", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
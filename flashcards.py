@@ -1,20 +1,48 @@
+import os
 import re
-import ollama
+import json
+import time
+import itertools
+import threading
+from collections import deque
+import llm  # Shared, cached access to the local model
+import instrumentation
+from concurrent.futures import ThreadPoolExecutor
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
-import pygame  # For sound effects
-
-# Init sound system
-pygame.mixer.init()
-
-# Load sound files
-hover_sound = pygame.mixer.Sound("hover.wav")
-click_sound = pygame.mixer.Sound("click.mp3")
-
-# Use Ollama to generate 5 flashcards from input text
-def generate_flashcards(text):
-    prompt = f"""
-Create exactly 5 study flashcards from the article below.
+from sound_bank import play_hover, play_click  # Shared sound effects
+import ui_dispatch  # Worker threads hand widget updates to the UI thread through this
+from deck_store import get_store, ReviewQueue, PagedDeck
+from ingest import open_article, preview_article
+
+# Long articles are split into chunks of about this many characters
+CHUNK_CHARS = 3000
+# Number of chunks sent to the model at the same time
+MAX_WORKERS = 2
+# Flashcards requested from each chunk of a long article
+CARDS_PER_CHUNK = 3
+# Fraction of the article's tokens kept when prompt compression is switched on
+COMPRESSION_RATIO = 0.3
+# Cards at least this similar to an earlier card of the same deck are dropped (see card_dedup.py)
+DEDUP_THRESHOLD = 0.5
+# Ask the model for JSON cards following a schema instead of numbered lines (Ollama 0.5+)
+STRUCTURED_OUTPUT = True
+# Most requests made to fill up one structured set of cards (the first plus re-requests)
+STRUCTURED_ATTEMPTS = 3
+
+# Cleared for the rest of the process once the server turns down structured output
+# (Ollama before 0.5), so later cards are asked for as numbered lines straight away
+_structured_supported = True
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+")
+NON_SPACE = re.compile(r"\S")
+JSON_SPECIAL = re.compile(r'[{}"\\]')
+
+# Prompt asking the model for num_cards flashcards about the text
+def build_prompt(text, num_cards=5):
+    return f"""
+Create exactly {num_cards} study flashcards from the article below.
 
 Each flashcard should be formatted as:
 1. Question
@@ -24,55 +52,517 @@ Be concise but informative.
 
 Do not include any sentences that are not included in the format provided. Do not make answers too long, more than 5 sentences is too much.
 Only include information from the article. No math problems, no word problems, nothing extra. Only things from the article provided.
-After the 5 questions, stop writing. Do not write anything before or after the five questions.
+After the {num_cards} questions, stop writing. Do not write anything before or after the {num_cards} questions.
 Make sure the questions and answers are complete.
 Article:
 {text}
 """
+
+# Use Ollama to generate flashcards (5 by default) from input text
+def generate_flashcards(text, num_cards=5):
     try:
-        response = ollama.chat(model='phi', messages=[{"role": "user", "content": prompt}])
-        return response['message']['content']
+        return llm.chat([{"role": "user", "content": build_prompt(text, num_cards)}], tool="flashcards",
+                        accept=has_flashcards)
     except Exception as e:
         return f"ERROR: {e}"
 
-# Extract Q&A from raw output
-def parse_flashcards(raw_text):
-    lines = raw_text.strip().splitlines()
-    flashcards = []
-    current_q = None
-    current_a = []
+# Stream the model's raw flashcard output piece by piece (raises on errors)
+def stream_flashcards(text, num_cards=5):
+    yield from llm.stream_chat([{"role": "user", "content": build_prompt(text, num_cards)}], tool="flashcards",
+                               accept=has_flashcards)
+
+# Only replies that give at least one card are cached, so "try again" really asks the model again
+def has_flashcards(raw_text):
+    return bool(parse_flashcards(raw_text))
+
+# JSON schema for a reply of exactly num_cards flashcards
+def flashcard_schema(num_cards=5):
+    card = {
+        "type": "object",
+        "properties": {"question": {"type": "string"}, "answer": {"type": "string"}},
+        "required": ["question", "answer"],
+    }
+    return {
+        "type": "object",
+        "properties": {"flashcards": {"type": "array", "items": card, "minItems": num_cards, "maxItems": num_cards}},
+        "required": ["flashcards"],
+    }
+
+# Prompt for structured output; avoid lists questions an earlier reply already covered
+def build_json_prompt(text, num_cards=5, avoid=()):
+    covered = ""
+    if avoid:
+        covered = "These questions are already covered, ask about other facts:\n"
+        covered += "".join(f"- {question}\n" for question in avoid) + "\n"
+    return f"""
+Create exactly {num_cards} study flashcards from the article below.
+
+Reply with JSON only, in this form:
+{{"flashcards": [{{"question": "...", "answer": "..."}}]}}
+
+Be concise but informative. Do not make answers too long, more than 5 sentences is too much.
+Only include information from the article. No math problems, no word problems, nothing extra. Only things from the article provided.
+Make sure the questions and answers are complete.
+{covered}Article:
+{text}
+"""
 
-    for line in lines:
+# One structured request for num_cards cards; new(cards) receives them as they are parsed.
+# A reply that is not JSON at all (a server that ignores format) goes through the line parser.
+def _request_json_cards(text, num_cards, avoid, stream, retry, new):
+    messages = [{"role": "user", "content": build_json_prompt(text, num_cards, avoid)}]
+    schema = flashcard_schema(num_cards)
+    # A re-request must not be answered with the cached reply it is meant to replace,
+    # and only a reply with every card asked for is worth caching
+    use_cache = not retry
+
+    def complete(raw):
+        return len(parse_json_flashcards(raw)) >= num_cards
+
+    parser = JsonCardStreamParser()
+    raw = []
+    try:
+        if stream:
+            for piece in llm.stream_chat(messages, use_cache=use_cache, tool="flashcards", format=schema,
+                                         accept=complete):
+                raw.append(piece)
+                new(parser.feed(piece))
+        else:
+            raw.append(llm.chat(messages, use_cache=use_cache, tool="flashcards", format=schema, accept=complete))
+            new(parser.feed(raw[0]))
+    finally:
+        new(parser.close())
+    if not parser.found:
+        new(parse_flashcards("".join(raw)))
+
+# Generate num_cards flashcards as JSON. Every well-formed card of a reply is kept, even
+# when the rest of it is cut off or garbled, and only the missing number of cards is
+# asked for again (up to STRUCTURED_ATTEMPTS requests in all). on_cards(cards), if given,
+# receives cards as they arrive (while the reply streams when stream is set).
+# Returns (cards, errors); cards parsed before an error are kept.
+def generate_flashcards_structured(text, num_cards=5, on_cards=None, stream=False):
+    global _structured_supported
+    if not _structured_supported:
+        return generate_flashcards_text(text, num_cards, on_cards, stream)
+    cards = []
+    errors = []
+    seen = set()
+
+    def new(batch):
+        fresh = []
+        for card in batch:
+            key = " ".join(card['question'].lower().split())
+            if len(cards) + len(fresh) < num_cards and key not in seen:
+                seen.add(key)
+                fresh.append(card)
+        cards.extend(fresh)
+        if on_cards and fresh:
+            on_cards(fresh)
+
+    requests = 0
+    while len(cards) < num_cards and requests < STRUCTURED_ATTEMPTS:
+        try:
+            _request_json_cards(text, num_cards - len(cards), [card['question'] for card in cards], stream,
+                                requests > 0, new)
+        except Exception as e:
+            if llm.format_rejected(e) and not cards:
+                # The server is too old for a format schema: use the line format from now on
+                _structured_supported = False
+                return generate_flashcards_text(text, num_cards, on_cards, stream)
+            errors.append(f"ERROR: {e}")
+            break
+        finally:
+            requests += 1
+    instrumentation.emit({"type": "flashcards_structured", "tool": "flashcards", "requested": num_cards,
+                          "cards": len(cards), "requests": requests})
+    return cards, errors
+
+# Generate num_cards flashcards as numbered lines, streamed when stream is set; on_cards
+# works as in generate_flashcards_structured. Returns (cards, errors); cards parsed
+# before an error are kept.
+def generate_flashcards_text(text, num_cards=5, on_cards=None, stream=False):
+    cards = []
+
+    def new(batch):
+        cards.extend(batch)
+        if on_cards and batch:
+            on_cards(batch)
+
+    if not stream:
+        raw = generate_flashcards(text, num_cards)
+        if raw.startswith("ERROR"):
+            return [], [raw]
+        new(parse_flashcards(raw))
+        return cards, []
+
+    parser = FlashcardStreamParser()
+    try:
+        for piece in stream_flashcards(text, num_cards):
+            new(parser.feed(piece))
+    except Exception as e:
+        return cards, [f"ERROR: {e}"]
+    finally:
+        # Whatever was complete when the stream ended (or broke off) still counts
+        new(parser.close())
+    return cards, []
+
+# Keep only the most informative sentences of the article (up to ratio of its tokens),
+# so the model spends less time reading the prompt; stats go to the metrics log
+def compress_article(text, ratio=COMPRESSION_RATIO):
+    from prompt_compression import compress_text  # NumPy is only loaded when compression is used
+    compressed, stats = compress_text(text, ratio)
+    instrumentation.emit({"type": "prompt_compression", "tool": "flashcards", **stats})
+    return compressed
+
+# Drops near-duplicate cards as they arrive; None when dedupe_threshold is None
+def make_deduper(dedupe_threshold=DEDUP_THRESHOLD):
+    if dedupe_threshold is None:
+        return None
+    from card_dedup import CardDeduper  # NumPy is only loaded when deduplication is used
+    return CardDeduper(dedupe_threshold)
+
+# Paragraphs of a stream of text blocks, each yielded once a blank line ends it, as
+# (text, whole) pairs. A paragraph running past max_buffer characters is passed on in
+# pieces (whole is False) cut at sentence ends, or at a multiple of max_chars inside a
+# very long sentence, so only about one paragraph's worth of text is held in memory.
+def iter_paragraphs(blocks, max_chars, max_buffer):
+    buffer = ""
+    cut = False  # Part of the current paragraph was already passed on
+    trim = True  # The buffer starts a paragraph or sentence, so leading whitespace goes
+    for block in blocks:
+        parts = PARAGRAPH_BREAK.split(buffer + block)
+        # The last part may continue in the next block
+        buffer = parts.pop()
+        for part in parts:
+            yield _paragraph_end(part, cut, trim)
+            cut = False
+            trim = True
+        # Cut oversized text by moving pos along, so a huge paragraph is not copied over and over
+        pos = 0
+        while True:
+            # Whitespace alone may still turn out to be half of a paragraph break
+            if trim:
+                text_start = NON_SPACE.search(buffer, pos)
+                if text_start:
+                    pos = text_start.start()
+                    trim = False
+            if len(buffer) - pos <= max_buffer:
+                break
+            ends = [match.end() for match in SENTENCE_BREAK.finditer(buffer, pos, pos + max_buffer + 1)]
+            end = ends[-1] if ends else pos + max_buffer - max_buffer % max_chars
+            # Trailing whitespace may end the paragraph, wait to see what follows it
+            if not NON_SPACE.search(buffer, end):
+                break
+            yield buffer[pos:end], False
+            trim = bool(ends) or buffer[end - 1] in ".!?"
+            pos = end
+            cut = True
+        buffer = buffer[pos:]
+    yield _paragraph_end(buffer, cut, trim)
+
+# The (text, whole) pair for the end of a paragraph, trimmed like the start of it was
+def _paragraph_end(text, cut, trim):
+    if not cut:
+        return text, True
+    return (text.strip() if trim else text.rstrip()), False
+
+# Chunks of at most max_chars from a stream of text blocks, produced lazily, so a
+# large file can be chunked while it is being read
+def iter_chunks(blocks, max_chars=CHUNK_CHARS):
+    current = ""
+    for paragraph, whole in iter_paragraphs(blocks, max_chars, 4 * max_chars):
+        # Pieces of a cut paragraph arrive trimmed where the paragraph itself starts and ends
+        if whole:
+            paragraph = paragraph.strip()
+        if not paragraph.strip():
+            continue
+        if whole and len(paragraph) <= max_chars:
+            pieces = [paragraph]
+        else:
+            # Paragraph is too long on its own, fall back to sentence boundaries
+            pieces = []
+            for sentence in SENTENCE_BREAK.split(paragraph):
+                # A single sentence longer than a chunk is hard-wrapped
+                while len(sentence) > max_chars:
+                    pieces.append(sentence[:max_chars])
+                    sentence = sentence[max_chars:]
+                if sentence:
+                    pieces.append(sentence)
+
+        for piece in pieces:
+            if current and len(current) + len(piece) + 2 > max_chars:
+                yield current
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        yield current
+
+# Chunk an article given as a string or as an iterable of text blocks (such as
+# ingest.open_article(path), so a big file is never read whole). Only the first two
+# chunks are made up front. Returns (single, chunks, compressed): single is the whole
+# text when it fits in one chunk (chunks is None), otherwise chunks iterates over all
+# of them. An article that fits in one chunk is never compressed, it would only lose
+# cards; compressed tells whether compression was applied.
+def open_chunks(article, max_chars=CHUNK_CHARS, compression=None):
+    text = article if isinstance(article, str) else None
+    chunks = iter_chunks([text] if text is not None else article, max_chars)
+    head = list(itertools.islice(chunks, 2))
+    if len(head) <= 1:
+        return (text if text is not None else "".join(head)), None, False
+    if not compression:
+        return None, itertools.chain(head, chunks), False
+    if text is not None:
+        single, chunks, _ = open_chunks(compress_article(text, compression), max_chars)
+        return single, chunks, True
+    # A streamed file is never held whole, so each chunk is shortened on its own
+    return None, (compress_article(chunk, compression) for chunk in itertools.chain(head, chunks)), True
+
+# Like pool.map(fn, items) in order, but submits at most `ahead` items before their
+# results are taken, so the items of a long stream are not all held at once
+def map_ahead(pool, fn, items, ahead):
+    pending = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# Generate one deck from a long article: map chunks over a worker pool, then merge.
+# article is a string or an iterable of text blocks (see open_chunks).
+# on_cards(cards), if given, receives each chunk's cards as soon as they are parsed;
+# compression, if given, is the ratio passed to compress_article first. Cards repeating
+# an earlier chunk's (at dedupe_threshold similarity) are dropped; None keeps them all.
+def generate_flashcards_chunked(article, cards_per_chunk=CARDS_PER_CHUNK, max_workers=MAX_WORKERS,
+                                max_chars=CHUNK_CHARS, on_cards=None, compression=None,
+                                dedupe_threshold=DEDUP_THRESHOLD, structured=STRUCTURED_OUTPUT):
+    single, chunks, compressed = open_chunks(article, max_chars, compression)
+    deduper = make_deduper(dedupe_threshold)
+    # Model calls on compressed text are marked in the metrics log, to compare their latency
+    with instrumentation.call_context(compressed=compressed):
+        if chunks is not None:
+            return _generate_from_chunks(chunks, cards_per_chunk, max_workers, on_cards, deduper, structured)
+        flashcards, errors = _chunk_flashcards(single, 5, structured)
+    if deduper:
+        flashcards = deduper.filter(flashcards)
+    if on_cards and flashcards:
+        on_cards(flashcards)
+    return flashcards, errors
+
+# Cards for one chunk as (cards, errors), as JSON (structured) or as numbered lines
+def _chunk_flashcards(chunk, num_cards, structured):
+    if structured:
+        return generate_flashcards_structured(chunk, num_cards)
+    return generate_flashcards_text(chunk, num_cards)
+
+def _generate_from_chunks(chunks, cards_per_chunk, max_workers, on_cards, deduper, structured=STRUCTURED_OUTPUT):
+    flashcards = []
+    errors = []
+    context = instrumentation.context_fields()
+
+    # Worker thread: the calling thread's metrics fields apply here too
+    def chunk_flashcards(chunk):
+        with instrumentation.call_context(**context):
+            return _chunk_flashcards(chunk, cards_per_chunk, structured)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Results come back in chunk order, so the deck follows the article
+        for cards, chunk_errors in map_ahead(pool, chunk_flashcards, chunks, 2 * max_workers):
+            errors.extend(chunk_errors)
+            if deduper:
+                cards = deduper.filter(cards)
+            flashcards.extend(cards)
+            if on_cards and cards:
+                on_cards(cards)
+    return flashcards, errors
+
+# Generate flashcards and hand them to on_cards(cards) as they become available:
+# card by card while streaming a short article, chunk by chunk for a long one.
+# article is a string or an iterable of text blocks (see open_chunks).
+# Returns the list of errors; cards delivered before an error are kept.
+def generate_flashcards_incremental(article, on_cards, compression=None, dedupe_threshold=DEDUP_THRESHOLD,
+                                    structured=STRUCTURED_OUTPUT):
+    try:
+        single, chunks, compressed = open_chunks(article, compression=compression)
+    except Exception as e:
+        return [f"ERROR: {e}"]
+    deduper = make_deduper(dedupe_threshold)
+    if chunks is not None:
+        try:
+            with instrumentation.call_context(compressed=compressed):
+                _, errors = _generate_from_chunks(chunks, CARDS_PER_CHUNK, MAX_WORKERS, on_cards, deduper,
+                                                  structured)
+        except Exception as e:
+            # Reading the rest of the file failed part way through
+            return [f"ERROR: {e}"]
+        return errors
+
+    def deliver(cards):
+        if deduper:
+            cards = deduper.filter(cards)
+        if cards:
+            on_cards(cards)
+
+    generate = generate_flashcards_structured if structured else generate_flashcards_text
+    with instrumentation.call_context(compressed=compressed):
+        _, errors = generate(single, 5, deliver, stream=True)
+    return errors
+
+# Incremental version of the flashcard parser: feed it streamed text and it returns
+# each question/answer pair as soon as the next question (or the end) shows it is complete
+class FlashcardStreamParser:
+    def __init__(self):
+        self.partial_line = ""
+        self.current_q = None
+        self.current_a = []
+
+    # Add streamed text; returns the flashcards it completed
+    def feed(self, chunk):
+        lines = (self.partial_line + chunk).split("\n")
+        # The last piece may be a line that is still being written
+        self.partial_line = lines.pop()
+        flashcards = []
+        for line in lines:
+            card = self._parse_line(line)
+            if card:
+                flashcards.append(card)
+        return flashcards
+
+    # End of the stream: finish the last line and the last card
+    def close(self):
+        flashcards = []
+        card = self._parse_line(self.partial_line)
+        if card:
+            flashcards.append(card)
+        self.partial_line = ""
+        card = self._finish_card()
+        if card:
+            flashcards.append(card)
+        self.current_q = None
+        self.current_a = []
+        return flashcards
+
+    def _finish_card(self):
+        if self.current_q and self.current_a:
+            return {'question': self.current_q, 'answer': ' '.join(self.current_a).strip()}
+        return None
+
+    # Handle one complete line; returns the previous card when a new question starts
+    def _parse_line(self, line):
         line = line.strip()
         match = re.match(r"^\d+\.\s*(.*)\?", line)
         if match:
-            if current_q and current_a:
-                flashcards.append({'question': current_q, 'answer': ' '.join(current_a).strip()})
-            current_q = match.group(1)
-            current_a = []
-            continue
+            card = self._finish_card()
+            self.current_q = match.group(1)
+            self.current_a = []
+            return card
 
         if line.startswith("Answer:"):
-            current_a = [line.replace("Answer:", "").strip()]
-            continue
+            self.current_a = [line.replace("Answer:", "").strip()]
+            return None
 
         if line.startswith("-"):
             cleaned_line = line.lstrip("-").strip()
             if cleaned_line:
-                current_a.append(cleaned_line)
-
-    if current_q and current_a:
-        flashcards.append({'question': current_q, 'answer': ' '.join(current_a).strip()})
+                self.current_a.append(cleaned_line)
+        return None
+
+# Streaming parser for structured (JSON) replies: every object holding a question and an
+# answer is returned as soon as its closing brace arrives. It never needs the reply to
+# be valid as a whole, so the cards before a cut-off or garbled part are kept.
+class JsonCardStreamParser:
+    def __init__(self):
+        self.text = ""
+        self.pos = 0  # Next character of text to look at
+        self.starts = []  # Where each object that is still open begins
+        self.in_string = False
+        self.found = False  # At least one JSON object was complete
+
+    # Add streamed text; returns the flashcards it completed
+    def feed(self, chunk):
+        self.text += chunk
+        text = self.text
+        flashcards = []
+        # Only braces, quotes and backslashes matter, so jump from one to the next
+        for match in JSON_SPECIAL.finditer(text, self.pos):
+            i = match.start()
+            if i < self.pos:
+                continue  # The character after a backslash
+            char = match.group()
+            self.pos = i + 1
+            if self.in_string:
+                if char == "\\":
+                    if i + 1 == len(text):
+                        self.pos = i  # Escaped character not here yet, look again next time
+                        break
+                    self.pos = i + 2
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.starts.append(i)
+            elif char == "}" and self.starts:
+                start = self.starts.pop()
+                self.found = True
+                card = _json_card(text[start:i + 1])
+                if card:
+                    flashcards.append(card)
+        else:
+            self.pos = len(text)
+        # Between objects nothing read so far is needed again
+        if not self.starts and not self.in_string:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        return flashcards
+
+    # End of the stream: an object still open was cut off and is dropped
+    def close(self):
+        self.text = ""
+        self.pos = 0
+        self.starts = []
+        self.in_string = False
+        return []
+
+# The card in one JSON object's source text, or None unless it has a non-empty
+# question and answer
+def _json_card(source):
+    try:
+        value = json.loads(source)
+    except ValueError:
+        return None
+    if not isinstance(value, dict):
+        return None
+    fields = {str(key).lower(): field for key, field in value.items()}
+    question = fields.get("question")
+    answer = fields.get("answer")
+    if not isinstance(question, str) or not isinstance(answer, str):
+        return None
+    question = " ".join(question.split())
+    answer = " ".join(answer.split())
+    if not question or not answer:
+        return None
+    return {'question': question, 'answer': answer}
+
+# Cards of a whole structured reply (the line parser's if it holds no JSON at all)
+def parse_json_flashcards(raw_text):
+    parser = JsonCardStreamParser()
+    flashcards = parser.feed(raw_text) + parser.close()
+    return flashcards if parser.found else parse_flashcards(raw_text)
 
-    return flashcards
+# Extract Q&A from raw output
+def parse_flashcards(raw_text):
+    parser = FlashcardStreamParser()
+    return parser.feed(raw_text.strip()) + parser.close()
 
-# Display flashcards in a flip-style UI
-def show_flashcards(flashcard_data):
-    flashcard_window = ctk.CTkToplevel()
+# Display flashcards in a flip-style UI; call set_deck() on the returned window to reuse it
+def show_flashcards(flashcard_data, master=None):
+    flashcard_window = ctk.CTkToplevel(master)
     flashcard_window.title("Flashcards Viewer")
     flashcard_window.geometry("800x600")
     flashcard_window.configure(fg_color="#282c3f")
 
+    deck = [flashcard_data]
     current_index = [0]
     showing_question = [True]
     content_var = ctk.StringVar()
@@ -92,7 +582,7 @@ def show_flashcards(flashcard_data):
 
     # Update flashcard content
     def update_card():
-        card = flashcard_data[current_index[0]]
+        card = deck[0][current_index[0]]
         text = card['question'] if showing_question[0] else card['answer']
         prefix = "Q: " if showing_question[0] else "A: "
         content_var.set(prefix + text)
@@ -102,7 +592,7 @@ def show_flashcards(flashcard_data):
         update_card()
 
     def next_card():
-        if current_index[0] < len(flashcard_data) - 1:
+        if current_index[0] < len(deck[0]) - 1:
             current_index[0] += 1
             showing_question[0] = True
             update_card()
@@ -113,88 +603,309 @@ def show_flashcards(flashcard_data):
             showing_question[0] = True
             update_card()
 
-    def play_hover_sound(event):
-        hover_sound.play()
-
-    def play_click_sound():
-        click_sound.play()
-
     # Buttons: Prev / Flip / Next
     prev_button = ctk.CTkButton(button_frame, text="Previous", command=prev_card, width=150, font=("Arial Rounded MT Bold", 24))
     prev_button.pack(side="left", padx=20)
-    prev_button.bind("<Enter>", play_hover_sound)
-    prev_button.configure(command=lambda: [prev_card(), play_click_sound()])
+    prev_button.bind("<Enter>", play_hover)
+    prev_button.configure(command=lambda: [prev_card(), play_click()])
 
     flip_button = ctk.CTkButton(button_frame, text="Flip", command=flip, width=150, font=("Arial Rounded MT Bold", 24))
     flip_button.pack(side="left", padx=20)
-    flip_button.bind("<Enter>", play_hover_sound)
-    flip_button.configure(command=lambda: [flip(), play_click_sound()])
+    flip_button.bind("<Enter>", play_hover)
+    flip_button.configure(command=lambda: [flip(), play_click()])
 
     next_button = ctk.CTkButton(button_frame, text="Next", command=next_card, width=150, font=("Arial Rounded MT Bold", 24))
     next_button.pack(side="left", padx=20)
-    next_button.bind("<Enter>", play_hover_sound)
-    next_button.configure(command=lambda: [next_card(), play_click_sound()])
-
+    next_button.bind("<Enter>", play_hover)
+    next_button.configure(command=lambda: [next_card(), play_click()])
+
+    # Show a new deck in this same window
+    def set_deck(flashcard_data):
+        deck[0] = flashcard_data
+        current_index[0] = 0
+        showing_question[0] = True
+        update_card()
+        update_title()
+        flashcard_window.deiconify()
+        flashcard_window.lift()
+
+    # Append cards that arrived after the viewer opened; Next reaches them right away
+    def add_cards(cards):
+        deck[0].extend(cards)
+        update_title()
+
+    # Show the card count, and whether more cards are still on the way
+    def set_generating(generating):
+        state['generating'] = generating
+        update_title()
+
+    state = {'generating': False}
+
+    def update_title():
+        suffix = " (generating...)" if state['generating'] else ""
+        flashcard_window.title(f"Flashcards Viewer - {len(deck[0])} cards{suffix}")
+
+    flashcard_window.set_deck = set_deck
+    flashcard_window.add_cards = add_cards
+    flashcard_window.set_generating = set_generating
+    # Closing only hides the viewer, the next deck reuses it
+    flashcard_window.protocol("WM_DELETE_WINDOW", flashcard_window.withdraw)
     flashcard_window.bind("<Escape>", lambda e: flashcard_window.attributes("-fullscreen", False))
     update_card()
+    update_title()
+    return flashcard_window
+
+# Name a saved deck after the start of its article and when it was made
+def make_deck_name(text):
+    words = " ".join(text.split()[:6])
+    if len(words) > 40:
+        words = words[:40].rstrip() + "..."
+    return f"{words} ({time.strftime('%Y-%m-%d %H:%M:%S')})"
+
+# Spaced-repetition review of saved decks: shows the most overdue card and
+# reschedules it (SM-2) from how well it was remembered
+def show_review(master=None):
+    store = get_store()
+    review_window = ctk.CTkToplevel(master)
+    review_window.title("Review Saved Cards")
+    review_window.geometry("900x600")
+    review_window.configure(fg_color="#282c3f")
+
+    state = {'queue': None, 'card': None, 'showing_question': True, 'decks': {}, 'browser': None}
+    content_var = ctk.StringVar()
+
+    top_frame = ctk.CTkFrame(review_window, fg_color="transparent")
+    top_frame.pack(fill="x", padx=20, pady=(20, 0))
+
+    deck_menu = ctk.CTkOptionMenu(top_frame, values=["All decks"], width=400,
+                                  command=lambda choice: load_queue())
+    deck_menu.pack(side="left")
+
+    label = ctk.CTkLabel(review_window, textvariable=content_var, font=("Arial Rounded MT Bold", 26),
+                         wraplength=800, justify="center")
+    label.pack(expand=True, fill="both", padx=40, pady=20)
+
+    # Fill the deck menu with saved decks and their due counts
+    def refresh():
+        state['decks'] = {"All decks": None}
+        for deck in store.list_decks():
+            state['decks'][f"{deck['name']} - {deck['due']}/{deck['cards']} due"] = deck['id']
+        deck_menu.configure(values=list(state['decks']))
+        deck_menu.set("All decks")
+        load_queue()
+        review_window.deiconify()
+        review_window.lift()
+
+    # Start a fresh queue for the chosen deck
+    def load_queue():
+        state['queue'] = ReviewQueue(store, deck_id=state['decks'].get(deck_menu.get()))
+        show_next()
+
+    def show_next():
+        state['card'] = state['queue'].next_card()
+        state['showing_question'] = True
+        if state['card'] is None:
+            wait = state['queue'].seconds_until_next()
+            if wait is None:
+                content_var.set("No saved cards yet. Generate some flashcards first.")
+            else:
+                content_var.set(f"All caught up! Next card is due in {format_wait(wait)}.")
+            return
+        content_var.set("Q: " + state['card']['question'])
+
+    def flip():
+        if state['card'] is None:
+            return
+        state['showing_question'] = not state['showing_question']
+        card = state['card']
+        content_var.set("Q: " + card['question'] if state['showing_question'] else "A: " + card['answer'])
 
-# Main UI to input or load text and trigger generation
-def run_flashcard_generator():
+    def grade(quality):
+        if state['card'] is None:
+            return
+        state['queue'].review(quality)
+        show_next()
+
+    # Page through the chosen deck without loading it all
+    def browse():
+        deck_id = state['decks'].get(deck_menu.get())
+        if deck_id is None or not store.count_cards(deck_id):
+            return
+        browser = state['browser']
+        if browser is not None and browser.winfo_exists():
+            browser.set_deck(PagedDeck(store, deck_id))
+        else:
+            state['browser'] = show_flashcards(PagedDeck(store, deck_id), review_window)
+
+    browse_button = ctk.CTkButton(top_frame, text="Browse Deck", command=browse, width=150)
+    browse_button.pack(side="right")
+    browse_button.bind("<Enter>", play_hover)
+    browse_button.configure(command=lambda: [browse(), play_click()])
+
+    # Buttons: Flip, then how well the answer was remembered
+    button_frame = ctk.CTkFrame(review_window)
+    button_frame.pack(side="bottom", fill="x", pady=20)
+    for text, command in [("Flip", flip), ("Again", lambda: grade(1)), ("Hard", lambda: grade(3)),
+                          ("Good", lambda: grade(4)), ("Easy", lambda: grade(5))]:
+        button = ctk.CTkButton(button_frame, text=text, width=140, font=("Arial Rounded MT Bold", 22))
+        button.pack(side="left", padx=12)
+        button.bind("<Enter>", play_hover)
+        button.configure(command=lambda command=command: [command(), play_click()])
+
+    review_window.refresh = refresh
+    # Closing only hides the window, it is reused next time
+    review_window.protocol("WM_DELETE_WINDOW", review_window.withdraw)
+    refresh()
+    return review_window
+
+# Human-friendly "in 5 minutes" / "in 2 days"
+def format_wait(seconds):
+    if seconds < 3600:
+        return f"{max(1, round(seconds / 60))} minutes"
+    if seconds < 86400:
+        return f"{round(seconds / 3600)} hours"
+    return f"{round(seconds / 86400)} days"
+
+# Main UI to input or load text and trigger generation (a child of the launcher's root)
+def run_flashcard_generator(master=None):
     ctk.set_appearance_mode("dark")
     ctk.set_default_color_theme("blue")
 
-    root = ctk.CTk()
-    root.title("Flashcard Generator")
-    root.geometry("800x600")
-    root.configure(fg_color="#282c3f")
-    ctk.CTkLabel(root, text="Paste Article Text:", font=("Arial Rounded MT Bold", 20)).pack(anchor="w", padx=30, pady=(25, 20))
+    window = ctk.CTkToplevel(master)
+    window.title("Flashcard Generator")
+    window.geometry("800x600")
+    window.configure(fg_color="#282c3f")
+    ctk.CTkLabel(window, text="Paste Article Text:", font=("Arial Rounded MT Bold", 20)).pack(anchor="w", padx=30, pady=(25, 20))
 
-    text_input = ctk.CTkTextbox(root, height=300, wrap="word", font=("Arial Rounded MT Bold", 14), corner_radius=35)
+    text_input = ctk.CTkTextbox(window, height=300, wrap="word", font=("Arial Rounded MT Bold", 14), corner_radius=35)
     text_input.pack(fill="both", expand=True, padx=30)
 
+    viewer = [None]
+    job = {'running': False, 'cards': 0, 'deck': [], 'name': ""}
+    # A loaded file is not put in the textbox whole: it shows a preview, and generation
+    # reads the file itself in chunks (unless the preview was edited)
+    loaded = {'path': None, 'shown': ""}
+
     # Load text from file
     def browse_file():
-        file_path = filedialog.askopenfilename(title="Select an Article File", filetypes=[("Text files", "*.txt")])
-        if file_path:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                text_input.delete("1.0", "end")
-                text_input.insert("end", content)
-
-    # Generate flashcards from input
+        file_path = filedialog.askopenfilename(title="Select an Article File", filetypes=[
+            ("Articles", "*.txt *.md *.markdown *.pdf"), ("Text files", "*.txt"),
+            ("Markdown", "*.md *.markdown"), ("PDF", "*.pdf")])
+        if not file_path:
+            return
+        try:
+            preview, truncated = preview_article(file_path)
+        except Exception as e:
+            messagebox.showerror("Could Not Open File", str(e))
+            return
+        if truncated:
+            preview += f"\n\n[... showing the beginning of {os.path.basename(file_path)}; the whole file is used ...]"
+        loaded['path'] = file_path if truncated else None
+        loaded['shown'] = preview.strip()
+        text_input.delete("1.0", "end")
+        text_input.insert("end", preview)
+
+    # Generate flashcards from input; the model runs on a worker thread and
+    # the viewer opens on the first finished card
     def generate():
+        if job['running']:
+            return
         content = text_input.get("1.0", "end").strip()
         if not content:
             messagebox.showwarning("Missing Text", "Please paste or load article content first.")
             return
-        raw = generate_flashcards(content)
-        if raw.startswith("ERROR"):
-            messagebox.showerror("AI Error", raw)
+
+        job['running'] = True
+        job['cards'] = 0
+        job['deck'] = []
+        job['name'] = make_deck_name(content)
+        generate_button.configure(state="disabled", text="Generating...")
+
+        compression = COMPRESSION_RATIO if compress_var.get() else None
+        # Untouched preview of a big file: stream the file instead of the textbox text
+        path = loaded['path'] if content == loaded['shown'] else None
+
+        # The worker hands cards to the UI thread, which moves them into the viewer
+        def work():
+            article = open_article(path) if path else content
+            errors = generate_flashcards_incremental(article, lambda cards: ui_dispatch.post(show_cards, cards),
+                                                     compression)
+            ui_dispatch.post(finish, errors)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def show_cards(cards):
+        first = job['cards'] == 0
+        job['cards'] += len(cards)
+        job['deck'].extend(cards)
+        if not first:
+            viewer[0].add_cards(cards)
+        # Reuse the viewer from the last run instead of building a new window
+        elif viewer[0] is not None and viewer[0].winfo_exists():
+            viewer[0].set_deck(list(cards))
+        else:
+            viewer[0] = show_flashcards(list(cards), window)
+        viewer[0].set_generating(True)
+
+    # Worker thread: store the deck, then tell the user about cards they already had
+    def save_deck(name, deck):
+        deck_id, dropped = get_store().add_deck(name, deck)
+        if dropped:
+            ui_dispatch.post(show_saved, len(deck), dropped, deck_id is not None)
+
+    def show_saved(total, dropped, saved):
+        if not saved:
+            messagebox.showinfo("Deck Not Saved", f"All {total} cards are already in your saved decks, "
+                                                  "so no new deck was saved.")
+        else:
+            messagebox.showinfo("Deck Saved", f"{dropped} of {total} cards are already in your saved decks "
+                                              "and were not saved again.")
+
+    def finish(errors):
+        job['running'] = False
+        generate_button.configure(state="normal", text="Generate Flashcards")
+        if job['cards']:
+            viewer[0].set_generating(False)
+            # Keep the deck, so studying it later does not need the model again. Saving checks
+            # every stored card for near-duplicates, so it runs off the UI thread.
+            threading.Thread(target=save_deck, args=(job['name'], job['deck']), daemon=True).start()
             return
-        data = parse_flashcards(raw)
-        if not data:
-            messagebox.showwarning("No Flashcards", "Flashcard generation failed. Please try again.")
+        if errors:
+            messagebox.showerror("AI Error", errors[0])
             return
-        show_flashcards(data)
-
-    def play_hover_sound(event):
-        hover_sound.play()
-
-    def play_click_sound():
-        click_sound.play()
+        messagebox.showwarning("No Flashcards", "Flashcard generation failed. Please try again.")
 
     # Buttons for browsing and generating
-    button_frame = ctk.CTkFrame(root, bg_color="transparent", fg_color="transparent")
+    button_frame = ctk.CTkFrame(window, bg_color="transparent", fg_color="transparent")
     button_frame.pack(fill="x", padx=10, pady=10)
 
     browse_button = ctk.CTkButton(button_frame, text="Browse File", command=browse_file, corner_radius=50, width=160, height=50)
     browse_button.pack(side="left", padx=17.5)
-    browse_button.bind("<Enter>", play_hover_sound)
-    browse_button.configure(command=lambda: [browse_file(), play_click_sound()])
+    browse_button.bind("<Enter>", play_hover)
+    browse_button.configure(command=lambda: [browse_file(), play_click()])
+
+    # Optional: send only the most informative sentences to the model
+    compress_var = ctk.BooleanVar(value=False)
+    compress_box = ctk.CTkCheckBox(button_frame, text="Shorten long articles", variable=compress_var)
+    compress_box.pack(side="left", padx=10)
 
     generate_button = ctk.CTkButton(button_frame, text="Generate Flashcards", command=generate, corner_radius=50, width=160, height=50)
     generate_button.pack(side="right", padx=17.5)
-    generate_button.bind("<Enter>", play_hover_sound)
-    generate_button.configure(command=lambda: [generate(), play_click_sound()])
+    generate_button.bind("<Enter>", play_hover)
+    generate_button.configure(command=lambda: [generate(), play_click()])
+
+    review_window = [None]
+
+    # Open (or bring back) the review window for saved decks
+    def review():
+        if review_window[0] is not None and review_window[0].winfo_exists():
+            review_window[0].refresh()
+        else:
+            review_window[0] = show_review(window)
+
+    review_button = ctk.CTkButton(button_frame, text="Review Saved Cards", command=review, corner_radius=50, width=160, height=50)
+    review_button.pack(side="right", padx=17.5)
+    review_button.bind("<Enter>", play_hover)
+    review_button.configure(command=lambda: [review(), play_click()])
 
-    root.mainloop()
+    return window
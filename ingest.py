@@ -0,0 +1,106 @@
+import os
+import re
+import codecs
+
+# Bytes read from a file at a time
+READ_BYTES = 64 * 1024
+# Characters of a loaded file shown in the Flashcards textbox
+PREVIEW_CHARS = 5000
+# File types the article readers understand
+ARTICLE_EXTENSIONS = (".txt", ".md", ".markdown", ".pdf")
+
+MARKDOWN_EXTENSIONS = (".md", ".markdown")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+MARKDOWN_RULES = [
+    (re.compile(r"<[^>\n]+>"), ""),                                 # HTML tags
+    (re.compile(r"!\[([^\]]*)\]\([^)]*\)"), r"\1"),                 # Images keep their alt text
+    (re.compile(r"\[([^\]]+)\]\([^)]*\)"), r"\1"),                  # Links keep their text
+    (re.compile(r"^\s{0,3}#{1,6}\s+(.*?)\s*#*\s*$"), r"\1."),       # Headings end like a sentence
+    (re.compile(r"^\s{0,3}>\s?"), ""),                              # Block quotes
+    (re.compile(r"^\s*(?:[-*_]\s*){3,}$"), ""),                     # Horizontal rules
+    (re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+"), ""),                  # List markers
+    (re.compile(r"(\*{1,3}|`+)(\S(?:.*?\S)?)\1"), r"\2"),           # Emphasis and inline code
+    (re.compile(r"(?<!\w)(_{1,3})(\S(?:.*?\S)?)\1(?!\w)"), r"\2"),  # Underscore emphasis, not snake_case
+]
+
+
+# Decode a text file in READ_BYTES blocks. The incremental decoder keeps multi-byte
+# characters that straddle two blocks intact, so memory stays at one block.
+def read_text_blocks(path, encoding="utf-8-sig"):
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(READ_BYTES)
+            block = decoder.decode(data, final=not data)
+            if block:
+                yield block
+            if not data:
+                return
+
+
+# Regroup text blocks into whole lines (with their newlines)
+def iter_lines(blocks):
+    partial = ""
+    for block in blocks:
+        lines = (partial + block).split("\n")
+        partial = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if partial:
+        yield partial
+
+
+# Markdown to plain text, line by line: code blocks are dropped and formatting marks removed
+def strip_markdown(blocks):
+    in_code = False
+    for line in iter_lines(blocks):
+        if FENCE_RE.match(line):
+            in_code = not in_code
+            continue
+        if in_code:
+            continue
+        text = line.rstrip("\n")
+        for pattern, replacement in MARKDOWN_RULES:
+            text = pattern.sub(replacement, text)
+        yield text + "\n"
+
+
+# Text of a PDF page by page (needs the optional pypdf package)
+def read_pdf_blocks(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("Reading PDF files needs the pypdf package (pip install pypdf)") from None
+    reader = PdfReader(path)
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        if text.strip():
+            # Pages are separate paragraphs, so the chunker may split between them
+            yield text + "\n\n"
+
+
+# Plain text of an article file as a stream of blocks, whatever its type
+def open_article(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".pdf":
+        return read_pdf_blocks(path)
+    if extension in MARKDOWN_EXTENSIONS:
+        return strip_markdown(read_text_blocks(path))
+    return read_text_blocks(path)
+
+
+# The first max_chars characters of an article, reading no more of the file than needed.
+# Returns (text, truncated).
+def preview_article(path, max_chars=PREVIEW_CHARS):
+    parts = []
+    size = 0
+    blocks = open_article(path)
+    try:
+        for block in blocks:
+            parts.append(block)
+            size += len(block)
+            if size > max_chars:
+                return "".join(parts)[:max_chars], True
+    finally:
+        blocks.close()
+    return "".join(parts), False
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# Where metrics are written, one JSON object per line (set AI_TOOLKIT_METRICS=off to disable)
+METRICS_PATH = os.environ.get(
+    "AI_TOOLKIT_METRICS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "metrics.jsonl")
+)
+# The file rotates at this size, keeping a few old copies
+MAX_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+# Recent records kept in memory for the stats overlay
+RECENT_CALLS = 200
+RECENT_LAG_SAMPLES = 600
+
+recent_calls = deque(maxlen=RECENT_CALLS)
+lag_samples = deque(maxlen=RECENT_LAG_SAMPLES)
+
+_logger = None
+_logger_lock = threading.Lock()
+_context = threading.local()
+
+
+# Logger writing to the rotating JSONL file, set up on first use (None if disabled)
+def _get_logger():
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            _logger = logging.getLogger("ai_toolkit.metrics")
+            _logger.propagate = False
+            _logger.setLevel(logging.INFO)
+            if METRICS_PATH and METRICS_PATH.lower() not in ("0", "off", "none"):
+                handler = RotatingFileHandler(METRICS_PATH, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT,
+                                              encoding="utf-8", delay=True)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                _logger.addHandler(handler)
+        return _logger
+
+
+# Write one metrics record
+def emit(record):
+    record.setdefault("ts", round(time.time(), 3))
+    _get_logger().info(json.dumps(record, ensure_ascii=False))
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+# Read a field from an Ollama response (pydantic model or plain dict); None if missing
+def _field(response, name):
+    try:
+        return response[name]
+    except (KeyError, TypeError, AttributeError):
+        return None
+
+
+# Extra fields for the llm_call records of calls started on this thread inside the block,
+# e.g. call_context(compressed=True) so compressed prompts can be told apart in the log
+@contextmanager
+def call_context(**fields):
+    previous = context_fields()
+    _context.fields = {**previous, **fields}
+    try:
+        yield
+    finally:
+        _context.fields = previous
+
+
+# The fields call_context() set on this thread (to carry them over to worker threads)
+def context_fields():
+    return getattr(_context, "fields", {})
+
+
+# Timing for one LLM call, from being queued to its outcome
+class LLMCall:
+    def __init__(self, tool, model, messages, stream):
+        self.context = context_fields()
+        self.tool = tool or "unknown"
+        self.model = model
+        self.stream = stream
+        self.prompt_chars = sum(len(m.get("content", "")) for m in messages)
+        self.prompt_tokens = None
+        self.tokens = 0
+        self.eval_seconds = None
+        self.queued_at = time.monotonic()
+        self.started_at = None
+        self.first_token_at = None
+        self.finished = False
+        self.lock = threading.Lock()
+
+    # The request left the queue and was sent to the server
+    def started(self):
+        self.started_at = time.monotonic()
+
+    # The first piece of the reply arrived
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    # Count a streamed piece
+    def add_token(self):
+        self.first_token()
+        self.tokens += 1
+
+    # Use the server's own counts when the response carries them
+    def set_usage(self, response):
+        eval_count = _field(response, "eval_count")
+        eval_duration = _field(response, "eval_duration")
+        prompt_eval_count = _field(response, "prompt_eval_count")
+        if eval_count:
+            self.tokens = eval_count
+        if eval_duration:
+            self.eval_seconds = eval_duration / 1e9
+        if prompt_eval_count:
+            self.prompt_tokens = prompt_eval_count
+
+    # Record the outcome ("ok", "cache_hit", "error", "timeout", "cancelled"); only the first call counts
+    def finish(self, outcome):
+        with self.lock:
+            if self.finished:
+                return
+            self.finished = True
+        now = time.monotonic()
+        started = self.started_at or now
+        generating = self.eval_seconds
+        if generating is None and self.first_token_at is not None:
+            generating = now - self.first_token_at
+        record = {
+            "type": "llm_call",
+            "ts": round(time.time(), 3),
+            "tool": self.tool,
+            "model": self.model,
+            "stream": self.stream,
+            "prompt_chars": self.prompt_chars,
+            "prompt_tokens": self.prompt_tokens,
+            "queue_wait_ms": _ms(started - self.queued_at),
+            "ttft_ms": _ms(self.first_token_at - self.queued_at) if self.first_token_at else None,
+            "total_ms": _ms(now - self.queued_at),
+            "tokens": self.tokens,
+            "tokens_per_sec": round(self.tokens / generating, 1) if self.tokens and generating else None,
+            "outcome": outcome,
+            **self.context,
+        }
+        recent_calls.append(record)
+        emit(record)
+
+
+# Start timing an LLM call (the caller must finish() it)
+def start_call(tool, model, messages, stream=False):
+    return LLMCall(tool, model, messages, stream)
+
+
+# Measures how late Tk `after` callbacks fire: a late callback means the UI thread was busy
+class EventLoopLagMonitor:
+    def __init__(self, root, interval_ms=100, report_seconds=30):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.report_seconds = report_seconds
+        self.expected = None
+        self.window = []
+        self.last_report = time.monotonic()
+        self.after_id = None
+
+    def start(self):
+        self._schedule()
+
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    def _schedule(self):
+        self.expected = time.monotonic() + self.interval_ms / 1000
+        self.after_id = self.root.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        now = time.monotonic()
+        lag = max(0.0, now - self.expected)
+        lag_samples.append(lag)
+        self.window.append(lag)
+        # Write a summary now and then rather than every sample
+        if now - self.last_report >= self.report_seconds:
+            self._report()
+            self.last_report = now
+        self._schedule()
+
+    def _report(self):
+        if not self.window:
+            return
+        ordered = sorted(self.window)
+        emit({
+            "type": "loop_lag",
+            "samples": len(ordered),
+            "p50_ms": _ms(ordered[len(ordered) // 2]),
+            "p95_ms": _ms(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]),
+            "max_ms": _ms(ordered[-1]),
+        })
+        self.window = []
+
+
+# Summary of recent activity for the on-screen overlay
+def snapshot(window_seconds=60):
+    now = time.time()
+    calls = [c for c in list(recent_calls) if now - c.get("ts", now) <= window_seconds]
+    model_calls = [c for c in calls if c["outcome"] != "cache_hit"]
+
+    def average(key):
+        values = [c[key] for c in model_calls if c.get(key) is not None]
+        return round(sum(values) / len(values), 1) if values else None
+
+    lags = sorted(lag_samples)
+    return {
+        "calls": len(calls),
+        "cache_hits": len(calls) - len(model_calls),
+        "errors": sum(1 for c in calls if c["outcome"] in ("error", "timeout")),
+        "avg_queue_wait_ms": average("queue_wait_ms"),
+        "avg_ttft_ms": average("ttft_ms"),
+        "avg_total_ms": average("total_ms"),
+        "avg_tokens_per_sec": average("tokens_per_sec"),
+        "last_call": recent_calls[-1] if recent_calls else None,
+        "lag_p95_ms": _ms(lags[min(len(lags) - 1, int(len(lags) * 0.95))]) if lags else None,
+        "lag_max_ms": _ms(lags[-1]) if lags else None,
+    }
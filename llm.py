@@ -0,0 +1,365 @@
+import os
+import time
+import queue
+import itertools
+import threading
+from concurrent.futures import Future, CancelledError, TimeoutError as FutureTimeoutError
+import ollama  # Used to get local AI models
+import instrumentation
+from llm_cache import get_cache, make_key
+
+# Model used by every tool
+MODEL = "phi"
+
+# Request priorities, lower numbers run first
+INTERACTIVE = 0  # Someone is waiting on the answer (explainer, flashcards)
+BACKGROUND = 10  # Nice to have, can wait (timer quotes)
+
+# Requests sent to the server at the same time, should match the server's OLLAMA_NUM_PARALLEL
+MAX_CONCURRENT = int(os.environ.get("OLLAMA_NUM_PARALLEL", "1"))
+# Seconds a request may wait in the queue for a free slot before giving up
+DEFAULT_TIMEOUT = 120
+# Seconds the server may go without sending anything (the whole reply, or the next
+# streamed piece) before a running request is abandoned; closing the connection makes
+# the server stop generating, so the slot is really freed
+REQUEST_TIMEOUT = 300
+
+# keep_alive values, in seconds the server keeps the model loaded after a request:
+# while a tool window is open (the launcher renews it in time, and it still runs out
+# if the app dies without saying goodbye) ...
+KEEP_ALIVE_OPEN = 30 * 60
+# ... and once every tool window is closed (the server's own default)
+KEEP_ALIVE_IDLE = 5 * 60
+
+# Marks the end of a streamed reply
+_END = object()
+# Marks a streamed reply abandoned through its CancelToken
+_CANCELLED = object()
+
+
+# Lets another thread (usually the UI) abort a streaming request. The reader stops
+# right away with CancelledError; a request still in the queue never runs, and a
+# running one closes its HTTP stream when the next piece arrives, which makes the
+# server stop generating.
+class CancelToken:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.callbacks = []
+        self.cancelled = False
+
+    def cancel(self):
+        with self.lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    # Run callback() on cancel (right away if that already happened)
+    def on_cancel(self, callback):
+        with self.lock:
+            if not self.cancelled:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+
+# One shared Ollama client (one HTTP connection pool) with a priority queue in front of it
+class LLMClient:
+    def __init__(self, host=None, max_concurrent=MAX_CONCURRENT):
+        self.client = ollama.Client(host=host, timeout=REQUEST_TIMEOUT)
+        self.max_concurrent = max(1, max_concurrent)
+        self.queue = queue.PriorityQueue()
+        self.order = itertools.count()  # Keeps FIFO order within a priority
+        self.workers = []
+        self.lock = threading.Lock()
+        # Sent with every request; None leaves it to the server (KEEP_ALIVE_IDLE)
+        self.keep_alive = None
+        # What the client last saw of MODEL: "cold", "loading", "ready" or "offline"
+        self.status = "cold"
+        self.loaded_until = None  # Monotonic time the server unloads MODEL, None = never
+
+    # Start the worker threads the first time something is submitted
+    def _start_workers(self):
+        with self.lock:
+            while len(self.workers) < self.max_concurrent:
+                worker = threading.Thread(target=self._work, daemon=True)
+                worker.start()
+                self.workers.append(worker)
+
+    # Wait for a submitted job's result: at most timeout seconds for it to leave the queue,
+    # then for as long as it runs (REQUEST_TIMEOUT stops a request the server stalls on).
+    # A running request is never abandoned, it would keep its slot busy regardless.
+    @staticmethod
+    def result(future, timeout=DEFAULT_TIMEOUT):
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise TimeoutError("Request timed out while waiting in the queue") from None
+            return future.result()
+
+    # Queue job(client) to run when a slot is free; returns a Future with its result
+    def submit(self, job, priority=INTERACTIVE, timeout=DEFAULT_TIMEOUT):
+        self._start_workers()
+        future = Future()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        self.queue.put((priority, next(self.order), deadline, job, future))
+        return future
+
+    # Worker loop: always take the most urgent request next
+    def _work(self):
+        while True:
+            _, _, deadline, job, future = self.queue.get()
+            # Skip requests the caller already gave up on
+            if not future.set_running_or_notify_cancel():
+                continue
+            if deadline is not None and time.monotonic() > deadline:
+                future.set_exception(TimeoutError("Request timed out while waiting in the queue"))
+                continue
+            try:
+                future.set_result(job(self.client))
+            except BaseException as e:
+                future.set_exception(e)
+
+    # MODEL was just used, so it stays loaded for another keep_alive
+    def _loaded(self, model):
+        if model != MODEL:
+            return
+        keep_alive = KEEP_ALIVE_IDLE if self.keep_alive is None else self.keep_alive
+        self.loaded_until = None if keep_alive < 0 else time.monotonic() + keep_alive
+        self.status = "ready"
+
+    # "ready" while MODEL should still be loaded on the server, "cold" once it has likely
+    # been unloaded, "loading" during load_model() and "offline" if that failed
+    def model_status(self):
+        if self.status == "ready" and self.loaded_until is not None and time.monotonic() > self.loaded_until:
+            return "cold"
+        return self.status
+
+    # Seconds until the server should unload MODEL (None if never or not loaded)
+    def model_expires_in(self):
+        if self.model_status() != "ready" or self.loaded_until is None:
+            return None
+        return self.loaded_until - time.monotonic()
+
+    # Load the model without generating anything (a chat with no messages), so the next
+    # real request does not pay the load time. keep_alive, if given, is used from now on,
+    # and this is also how it reaches the server without waiting for the next request.
+    def load_model(self, model=MODEL, keep_alive=None, priority=INTERACTIVE):
+        if keep_alive is not None:
+            self.keep_alive = keep_alive
+        if model == MODEL and self.model_status() != "ready":
+            self.status = "loading"
+        start = time.perf_counter()
+
+        def job(client):
+            client.chat(model=model, messages=[], keep_alive=self.keep_alive)
+            self._loaded(model)
+
+        def done(future):
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None and model == MODEL:
+                self.status = "offline"
+            instrumentation.emit({"type": "model_load", "model": model, "ok": error is None,
+                                  "keep_alive": self.keep_alive,
+                                  "load_ms": round((time.perf_counter() - start) * 1000, 1)})
+
+        # Never expires in the queue: the model has to be loaded before anything else runs anyway
+        future = self.submit(job, priority, timeout=None)
+        future.add_done_callback(done)
+        return future
+
+    # Run a chat request and return the reply text
+    def chat(self, messages, model=MODEL, options=None, priority=INTERACTIVE, timeout=DEFAULT_TIMEOUT,
+             tool=None, format=None):
+        call = instrumentation.start_call(tool, model, messages)
+
+        def job(client):
+            call.started()
+            response = client.chat(model=model, messages=messages, options=options, format=format,
+                                   keep_alive=self.keep_alive)
+            self._loaded(model)
+            call.first_token()
+            call.set_usage(response)
+            return response['message']['content']
+
+        future = self.submit(job, priority, timeout)
+        try:
+            content = self.result(future, timeout)
+        except TimeoutError:
+            call.finish("timeout")
+            raise
+        except BaseException:
+            future.cancel()
+            call.finish("error")
+            raise
+        call.finish("ok")
+        return content
+
+    # Stream a chat reply; the request holds its slot until the stream ends, the caller
+    # stops reading or cancel (a CancelToken) is cancelled. timeout only limits the wait
+    # for a slot, gaps between pieces are limited by REQUEST_TIMEOUT.
+    def stream_chat(self, messages, model=MODEL, options=None, priority=INTERACTIVE, timeout=DEFAULT_TIMEOUT,
+                    tool=None, cancel=None, format=None):
+        pieces = queue.Queue()
+        stop = threading.Event()
+        call = instrumentation.start_call(tool, model, messages, stream=True)
+
+        def job(client):
+            call.started()
+            stream = None
+            try:
+                stream = client.chat(model=model, messages=messages, options=options, stream=True,
+                                     format=format, keep_alive=self.keep_alive)
+                for chunk in stream:
+                    if stop.is_set() or (cancel is not None and cancel.cancelled):
+                        break
+                    call.add_token()
+                    if chunk.get('done'):
+                        call.set_usage(chunk)
+                        self._loaded(model)
+                    pieces.put(chunk['message']['content'])
+            except BaseException as e:
+                pieces.put(e)
+            finally:
+                # Closing the stream releases the HTTP connection back to the pool
+                if stream is not None:
+                    stream.close()
+                pieces.put(_END)
+
+        future = self.submit(job, priority, timeout)
+        # Also wakes the reader when the request never runs (cancelled or expired in the queue)
+        future.add_done_callback(lambda f: pieces.put(_END))
+        if cancel is not None:
+            cancel.on_cancel(lambda: pieces.put(_CANCELLED))
+        outcome = "cancelled"  # Unless the stream runs to the end or fails
+        try:
+            while True:
+                try:
+                    # Once the request runs, the HTTP client's timeout takes over
+                    waiting = not (future.running() or future.done())
+                    piece = pieces.get(timeout=timeout if waiting else None)
+                except queue.Empty:
+                    if not future.cancel():
+                        continue  # Started just now
+                    outcome = "timeout"
+                    raise TimeoutError("Request timed out while waiting in the queue")
+                if piece is _END:
+                    break
+                if piece is _CANCELLED:
+                    raise CancelledError("Request cancelled")
+                if isinstance(piece, BaseException):
+                    outcome = "error"
+                    raise piece
+                yield piece
+            # Surface errors from a request that never started (e.g. expired in the queue)
+            if cancel is not None and cancel.cancelled:
+                raise CancelledError("Request cancelled")
+            if future.done() and not future.cancelled() and future.exception() is not None:
+                outcome = "timeout" if isinstance(future.exception(), TimeoutError) else "error"
+                raise future.exception()
+            outcome = "ok"
+        finally:
+            stop.set()
+            future.cancel()
+            call.finish(outcome)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# Process-wide client shared by all tools, created on first use
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
+
+
+# Record a response served from the cache, so the stats show what the model was spared
+def _record_cache_hit(tool, model, messages, stream):
+    call = instrumentation.start_call(tool, model, messages, stream)
+    call.started()
+    call.first_token()
+    call.finish("cache_hit")
+
+
+# Send a chat request and return the reply text, served from the cache when possible.
+# tool names the caller in the metrics (e.g. "flashcards"); format asks for JSON output
+# ("json", or a JSON schema the reply must follow). accept(reply), if given, decides
+# whether a reply is good enough to cache, so a retry of an unusable one asks the model again.
+def chat(messages, model=MODEL, options=None, use_cache=True, priority=INTERACTIVE, timeout=DEFAULT_TIMEOUT,
+         tool=None, format=None, accept=None):
+    key = make_key(model, messages, options, format) if use_cache else None
+    if key:
+        cached = get_cache().get(key)
+        if cached is not None and (accept is None or accept(cached)):
+            _record_cache_hit(tool, model, messages, False)
+            return cached
+
+    content = get_client().chat(messages, model, options, priority, timeout, tool, format)
+    if key and (accept is None or accept(content)):
+        get_cache().put(key, content, model)
+    return content
+
+
+# Stream a chat reply as text pieces; a cache hit is yielded in one piece.
+# cancel, a CancelToken, aborts the request from another thread (raises CancelledError);
+# accept works as for chat().
+def stream_chat(messages, model=MODEL, options=None, use_cache=True, priority=INTERACTIVE,
+                timeout=DEFAULT_TIMEOUT, tool=None, cancel=None, format=None, accept=None):
+    key = make_key(model, messages, options, format) if use_cache else None
+    if key:
+        cached = get_cache().get(key)
+        if cached is not None and (accept is None or accept(cached)):
+            _record_cache_hit(tool, model, messages, True)
+            yield cached
+            return
+
+    pieces = []
+    for piece in get_client().stream_chat(messages, model, options, priority, timeout, tool, cancel, format):
+        pieces.append(piece)
+        yield piece
+    # Only complete replies are cached, an interrupted stream stores nothing
+    content = "".join(pieces)
+    if key and (accept is None or accept(content)):
+        get_cache().put(key, content, model)
+
+
+# True when the server refused a request's format: Ollama before 0.5 only understands
+# format="json" and turns down a JSON schema with HTTP 400 (failing to read the format
+# field). Other 400s, e.g. a bad option, say nothing about format and are not this.
+def format_rejected(error):
+    if not isinstance(error, ollama.ResponseError) or error.status_code != 400:
+        return False
+    message = str(error.error).lower()
+    return "format" in message or "schema" in message
+
+
+# Load the model in the background ahead of the first request; returns a Future
+def warm_up(model=MODEL, keep_alive=None):
+    return get_client().load_model(model, keep_alive)
+
+
+# Change how long the model stays loaded after requests. With load, it is applied to the
+# server right away (loading the model if needed) and a Future is returned; without, it
+# only goes along with the next request.
+def set_keep_alive(keep_alive, model=MODEL, load=True):
+    client = get_client()
+    if load:
+        return client.load_model(model, keep_alive)
+    client.keep_alive = keep_alive
+
+
+def model_status():
+    return get_client().model_status()
+
+
+def model_expires_in():
+    return get_client().model_expires_in()
@@ -1,9 +1,41 @@
-# Import required modules and custom scripts
-from flashcards import run_flashcard_generator
-from ai_timer import launch_ai_timer
-from ai_concept_explainer import launch_ai_concept_explainer
+# Import required modules; the tools themselves (and ollama/pygame) are imported on first use
+import time
+import importlib
+import threading
 from customtkinter import *
-import pygame
+import sound_bank  # Light: pygame is only imported when the sounds are loaded
+import ui_dispatch
+from window_manager import WindowManager
+from instrumentation import EventLoopLagMonitor
+from stats_overlay import StatsOverlay
+
+# Tool buttons: module to import and function to call when clicked
+TOOLS = {
+    "flashcards": ("flashcards", "run_flashcard_generator"),
+    "concept": ("ai_concept_explainer", "launch_ai_concept_explainer"),
+    "timer": ("ai_timer", "launch_ai_timer"),
+}
+
+# How often the model readiness label is refreshed (milliseconds)
+MODEL_CHECK_MS = 1000
+# Seconds between attempts to load the model while Ollama cannot be reached
+MODEL_RETRY_SECONDS = 15
+# While a tool is open, the model's keep_alive is renewed once less than this many seconds are left
+KEEP_ALIVE_RENEW_SECONDS = 5 * 60
+# Readiness label text and colour for each llm.model_status()
+MODEL_STATUS = {
+    "loading": ("Model: loading...", "#e0a040"),
+    "ready": ("Model: ready", "#5cc27a"),
+    "cold": ("Model: unloaded, loads when a tool opens", "#8a93a6"),
+    "offline": ("Model: unavailable (is Ollama running?), retrying", "#e06060"),
+}
+
+
+# Import a tool module the first time its button is clicked and return its window builder
+def load_tool(name):
+    module_name, func_name = TOOLS[name]
+    module = importlib.import_module(module_name)  # Cached by Python after the first import
+    return getattr(module, func_name)
 
 
 # Main class to create the UI and handle interactions
@@ -13,21 +45,115 @@ class ResponsiveApp:
         self.root.title("AI Toolkit")
         self.root.attributes("-fullscreen", True)  # Start in fullscreen mode
 
-        # Initialize pygame for sound effects
-        pygame.mixer.init()
-        self.hover_sound = pygame.mixer.Sound("hover.wav")
-        self.click_sound = pygame.mixer.Sound("click.mp3")
+        # Widget updates posted by worker threads are applied once per frame
+        ui_dispatch.start(root)
+
+        # Tool windows live under this root and are reused once built
+        self.windows = WindowManager(root, on_change=self.tools_changed)
+
+        # The llm module once the background warm-up has imported it
+        self.llm = None
+        self.tool_open = False
+        self.model_shown = None
+        self.next_retry = 0.0
+        self.renewing = None  # Future of a keep_alive renewal still on its way
+
+        # Track how responsive the UI thread is; F12 shows live stats from any window
+        self.lag_monitor = EventLoopLagMonitor(root)
+        self.lag_monitor.start()
+        self.stats_overlay = StatsOverlay(root)
+        self.root.bind_all("<F12>", self.stats_overlay.toggle)
 
         # Setup UI layout
         self.create_layout()
+        self.root.after_idle(lambda: threading.Thread(target=self.load_audio, daemon=True).start())
+        self.root.after_idle(lambda: threading.Thread(target=self.load_semantic_cache, daemon=True).start())
+        self.root.after_idle(lambda: threading.Thread(target=self.warm_up_model, daemon=True).start())
+        self.root.after(MODEL_CHECK_MS, self.check_model)
+
+    # Decode the shared UI sounds and start the music off the startup path
+    def load_audio(self):
+        sound_bank.bank.load()
+        if not sound_bank.bank.available:
+            return
+
+        # Load and play background music on loop (optional, skipped if the file is missing)
+        import pygame
+        try:
+            pygame.mixer.music.load("background.wav")
+            pygame.mixer.music.set_volume(0.2)
+            pygame.mixer.music.play(-1)
+        except pygame.error:
+            pass
+
+    # Read the Concept Explainer's semantic cache index from disk before it is needed
+    def load_semantic_cache(self):
+        from semantic_cache import get_semantic_cache
+        get_semantic_cache()
+
+    # Load the model while the user is still on the launcher, so the first request from a
+    # tool does not pay the model load time
+    def warm_up_model(self):
+        import llm  # Pulls in ollama, kept off the UI thread
+        llm.warm_up(keep_alive=self.keep_alive(llm))
+        self.llm = llm
+
+    # Keep the model loaded while any tool window is open (check_model renews it in time),
+    # then let the server unload it after the usual idle time
+    def keep_alive(self, llm):
+        return llm.KEEP_ALIVE_OPEN if self.tool_open else llm.KEEP_ALIVE_IDLE
+
+    # Called by the window manager when a tool window is shown or hidden
+    def tools_changed(self, names):
+        tool_open = bool(names)
+        if tool_open == self.tool_open:
+            return
+        self.tool_open = tool_open
+        # Before the warm-up has run, it picks up the new setting itself. Opening a
+        # tool also reloads the model if the server unloaded it in the meantime; closing
+        # the last one only tells the server when the model is loaded, never loads it.
+        if self.llm is not None:
+            self.llm.set_keep_alive(self.keep_alive(self.llm),
+                                    load=tool_open or self.llm.model_status() == "ready")
+
+    # Refresh the readiness label, and load the model again if it went away while needed
+    def check_model(self):
+        status = self.llm.model_status() if self.llm is not None else "loading"
+        if status == "offline" and time.monotonic() >= self.next_retry:
+            self.next_retry = time.monotonic() + MODEL_RETRY_SECONDS
+            self.llm.warm_up(keep_alive=self.keep_alive(self.llm))
+        elif status == "cold" and self.tool_open:
+            self.llm.warm_up(keep_alive=self.keep_alive(self.llm))
+        elif status == "ready" and self.tool_open and (self.renewing is None or self.renewing.done()):
+            # Keep the model loaded for as long as a tool stays open
+            expires_in = self.llm.model_expires_in()
+            if expires_in is not None and expires_in < KEEP_ALIVE_RENEW_SECONDS:
+                self.renewing = self.llm.set_keep_alive(self.keep_alive(self.llm))
+        if status != self.model_shown:
+            self.model_shown = status
+            text, color = MODEL_STATUS[status]
+            self.model_label.configure(text=text, text_color=color)
+        self.root.after(MODEL_CHECK_MS, self.check_model)
+
+    # Hand the model back to the server's idle timeout on exit, instead of leaving it loaded
+    def shutdown(self):
+        if self.llm is not None and self.tool_open and self.llm.model_status() == "ready":
+            try:
+                self.llm.set_keep_alive(self.llm.KEEP_ALIVE_IDLE).result(timeout=2)
+            except Exception:
+                pass  # Not worth delaying the exit for
+
+    # Open a tool window, building it on first use
+    def open_tool(self, name):
+        self.windows.show(name, load_tool(name))
 
     # Play hover sound when mouse enters a button
     def play_hover(self, event=None):
-        self.hover_sound.play()
+        sound_bank.play_hover()
 
     # Play click sound and run function after short delay
     def play_click(self, func):
-        self.click_sound.play()
+        sound_bank.play_click()
         self.root.after(100, func)  # Slight delay to finish click sound before executing
 
     # Attach sound effects to a button's events
@@ -47,23 +173,27 @@ class ResponsiveApp:
                                text_color="white")
         title_label.place(relx=0.5, rely=0.05, anchor="n")
 
+        # Model readiness, kept up to date by check_model
+        self.model_label = CTkLabel(master=self.root, text="", font=("Arial Rounded MT Bold", 18))
+        self.model_label.place(relx=0.5, rely=0.95, anchor="s")
+
         # Flashcard button
         flashcard_button = CTkButton(main_frame, height=100, width=500, corner_radius=100, text="Flashcards",
                                      font=("Arial Rounded MT Bold", 35), fg_color="#162539")
         flashcard_button.pack(pady=30)
-        self.add_sound_events(flashcard_button, run_flashcard_generator)
+        self.add_sound_events(flashcard_button, lambda: self.open_tool("flashcards"))
 
         # Concept Explainer button
         concept_button = CTkButton(main_frame, height=100, width=500, corner_radius=100, text="Concept Explainer",
                                    font=("Arial Rounded MT Bold", 35), fg_color="#162539")
         concept_button.pack(pady=30)
-        self.add_sound_events(concept_button, launch_ai_concept_explainer)
+        self.add_sound_events(concept_button, lambda: self.open_tool("concept"))
 
         # AI Timer button
         timer_button = CTkButton(main_frame, height=100, width=500, corner_radius=100, text="AI Timer",
                                  font=("Arial Rounded MT Bold", 35), fg_color="#162539")
         timer_button.pack(pady=30)
-        self.add_sound_events(timer_button, launch_ai_timer)
+        self.add_sound_events(timer_button, lambda: self.open_tool("timer"))
 
         # Quit button
         quit_button = CTkButton(main_frame, height=100, width=500, corner_radius=100, text="Quit",
@@ -78,12 +208,7 @@ if __name__ == "__main__":
     root.configure(fg_color="#282c3f")  # Set background color
     set_default_color_theme("dark-blue")  # Set UI theme
 
-    app = ResponsiveApp(root)  # Initialize the app
-
-    # Load and play background music on loop
-    pygame.mixer.init()
-    pygame.mixer.music.load("background.wav")
-    pygame.mixer.music.set_volume(0.2)
-    pygame.mixer.music.play(-1)
+    app = ResponsiveApp(root)  # Initialize the app (audio loads in the background)
 
     root.mainloop()  # Start the GUI event loop
+    app.shutdown()
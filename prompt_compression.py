@@ -0,0 +1,141 @@
+import re
+import math
+import time
+import numpy as np
+
+# Keep about this fraction of the article's tokens by default
+COMPRESSION_RATIO = 0.3
+# Above this many sentences the full similarity graph gets expensive, so sentences
+# are scored by similarity to the whole document instead of TextRank
+MAX_GRAPH_SENTENCES = 1000
+# TextRank damping factor and power-iteration limits
+DAMPING = 0.85
+ITERATIONS = 50
+TOLERANCE = 1e-6
+
+STOP_WORDS = set("""
+a an and are as at be been but by can could did do does for from had has have he her his how i if in into
+is it its just may more most my no not of on or our out over she so some such than that the their them then
+there these they this those to too up us was we were what when where which while who why will with would you your
+""".split())
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+# Rough token count (about 4 characters per token for English text)
+def estimate_tokens(text):
+    return max(1, len(text) // 4) if text else 0
+
+
+# Split into sentences, dropping boilerplate like menu items, captions and repeats
+def split_sentences(text):
+    sentences = []
+    seen = set()
+    for sentence in SENTENCE_RE.split(text):
+        sentence = " ".join(sentence.split())
+        # Short fragments without sentence punctuation are usually navigation or headings
+        if len(sentence.split()) < 4 and not sentence.endswith((".", "!", "?")):
+            continue
+        key = sentence.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        sentences.append(sentence)
+    return sentences
+
+
+# L2-normalised TF-IDF matrix, one row per sentence
+def tfidf_matrix(sentences):
+    vocabulary = {}
+    rows = []
+    columns = []
+    for row, sentence in enumerate(sentences):
+        for word in WORD_RE.findall(sentence.lower()):
+            if word in STOP_WORDS:
+                continue
+            rows.append(row)
+            columns.append(vocabulary.setdefault(word, len(vocabulary)))
+
+    counts = np.zeros((len(sentences), max(1, len(vocabulary))))
+    np.add.at(counts, (np.array(rows, dtype=int), np.array(columns, dtype=int)), 1.0)
+
+    lengths = counts.sum(axis=1, keepdims=True)
+    tf = np.divide(counts, lengths, out=np.zeros_like(counts), where=lengths > 0)
+    document_frequency = (counts > 0).sum(axis=0)
+    idf = np.log((1 + len(sentences)) / (1 + document_frequency)) + 1
+    weights = tf * idf
+    norms = np.linalg.norm(weights, axis=1, keepdims=True)
+    return np.divide(weights, norms, out=np.zeros_like(weights), where=norms > 0)
+
+
+# PageRank over the sentence similarity graph
+def textrank(similarity):
+    graph = similarity.copy()
+    np.fill_diagonal(graph, 0.0)
+    out_weight = graph.sum(axis=1, keepdims=True)
+    transition = np.divide(graph, out_weight, out=np.zeros_like(graph), where=out_weight > 0)
+
+    count = len(graph)
+    scores = np.full(count, 1.0 / count)
+    for _ in range(ITERATIONS):
+        updated = (1 - DAMPING) / count + DAMPING * transition.T @ scores
+        if np.abs(updated - scores).sum() < TOLERANCE:
+            return updated
+        scores = updated
+    return scores
+
+
+# Importance score for every sentence
+def score_sentences(sentences):
+    vectors = tfidf_matrix(sentences)
+    if len(sentences) <= MAX_GRAPH_SENTENCES:
+        centrality = textrank(vectors @ vectors.T)
+    else:
+        # Linear-time stand-in: similarity to the document's centroid
+        centrality = vectors @ vectors.sum(axis=0)
+    # Sentences that carry rare terms matter even when they are not central
+    richness = (vectors > 0).sum(axis=1) * vectors.max(axis=1, initial=0.0)
+
+    def normalise(values):
+        spread = values.max() - values.min()
+        return (values - values.min()) / spread if spread > 0 else np.ones_like(values)
+
+    return 0.8 * normalise(centrality) + 0.2 * normalise(richness)
+
+
+# Keep the most informative sentences, in their original order, within a token budget.
+# Returns the compressed text and stats about what was saved.
+def compress_text(text, ratio=COMPRESSION_RATIO, max_tokens=None):
+    start = time.perf_counter()
+    original_tokens = estimate_tokens(text)
+    budget = max_tokens if max_tokens is not None else math.ceil(original_tokens * ratio)
+    sentences = split_sentences(text)
+
+    if original_tokens <= budget or len(sentences) < 2:
+        compressed = text
+        kept = len(sentences)
+    else:
+        scores = score_sentences(sentences)
+        chosen = []
+        used = 0
+        for index in np.argsort(-scores, kind="stable"):
+            cost = estimate_tokens(sentences[index])
+            if used + cost > budget and chosen:
+                continue
+            chosen.append(index)
+            used += cost
+        chosen.sort()
+        compressed = " ".join(sentences[i] for i in chosen)
+        kept = len(chosen)
+
+    compressed_tokens = estimate_tokens(compressed)
+    return compressed, {
+        "original_tokens": original_tokens,
+        "compressed_tokens": compressed_tokens,
+        "tokens_saved": original_tokens - compressed_tokens,
+        "ratio": round(compressed_tokens / original_tokens, 3) if original_tokens else 1.0,
+        "sentences_kept": kept,
+        "sentences_total": len(sentences),
+        "compress_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
@@ -0,0 +1,272 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+import threading
+import numpy as np
+import llm
+
+# Default location of the cache file (next to the scripts, can be overridden)
+SEMANTIC_CACHE_PATH = os.environ.get(
+    "AI_TOOLKIT_SEMANTIC_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "semantic_cache.sqlite3")
+)
+# How queries are embedded: "hashing" works fully offline, anything else is taken as
+# the name of an Ollama embedding model (e.g. "nomic-embed-text")
+EMBEDDINGS = os.environ.get("AI_TOOLKIT_EMBEDDINGS", "hashing")
+# Cosine similarity at which a stored explanation is served for a new query
+SIMILARITY_THRESHOLD = 0.85
+# Closest stored queries looked at per lookup
+TOP_K = 3
+# Most explanations kept before the least recently used ones are evicted
+MAX_ENTRIES = 1000
+# Seconds a stored explanation stays valid (30 days)
+TTL_SECONDS = 30 * 24 * 60 * 60
+# Length of the hashing vectorizer's vectors
+HASH_DIM = 2048
+# Seconds an embedding request may wait for a free slot
+EMBED_TIMEOUT = 30
+
+# Question and instruction words that do not change what is being asked about
+QUERY_STOP_WORDS = set("""
+a about an and are as at be briefly by can could define definition describe do does example examples
+explain explained explanation for give help how i in into is it its me mean meaning means my of on or please
+quick really short simple simply so tell terms that the this to understand what whats which why with words would you
+""".split())
+
+# Question words that change what kind of answer is wanted. They are left out of the
+# embedding like other question words, but two queries only match when they ask the
+# same kind of thing; a query with none of them asks for an explanation.
+INTENT_WORDS = {
+    "how": "how",
+    "why": "why",
+    "when": "when",
+    "where": "where",
+    "who": "who",
+    "example": "example", "examples": "example", "instance": "example",
+    "difference": "compare", "differences": "compare", "compare": "compare", "vs": "compare", "versus": "compare",
+    "what": "explain", "whats": "explain", "define": "explain", "definition": "explain", "explain": "explain",
+    "explained": "explain", "explanation": "explain", "describe": "explain", "mean": "explain",
+    "meaning": "explain", "means": "explain",
+}
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+# Same text up to case and spacing
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+
+# The kinds of answer a query asks for (see INTENT_WORDS)
+def query_intent(query):
+    intent = {INTENT_WORDS[word] for word in WORD_RE.findall(query.lower()) if word in INTENT_WORDS}
+    return intent or {"explain"}
+
+
+# Offline embedding: content words, word pairs and character trigrams hashed into a
+# fixed-size vector (with a hashed sign, so collisions tend to cancel out)
+class HashingEmbedder:
+    def __init__(self, dim=HASH_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def features(self, text):
+        words = [w[:-1] if len(w) > 3 and w.endswith("s") else w
+                 for w in WORD_RE.findall(text.lower()) if w not in QUERY_STOP_WORDS]
+        if not words:
+            words = WORD_RE.findall(text.lower())
+        features = [(word, 1.0) for word in words]
+        features += [(f"{a} {b}", 0.5) for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            features += [(padded[i:i + 3], 0.3) for i in range(len(padded) - 2)]
+        return features
+
+    def embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self.features(text):
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+# Embeddings from an Ollama embedding model, sent through the shared request queue
+class OllamaEmbedder:
+    def __init__(self, model):
+        self.model = model
+        self.name = f"ollama:{model}"
+
+    def embed(self, text):
+        client = llm.get_client()
+        future = client.submit(lambda ollama_client: ollama_client.embed(model=self.model, input=text),
+                               llm.INTERACTIVE, EMBED_TIMEOUT)
+        vector = np.asarray(client.result(future, EMBED_TIMEOUT)['embeddings'][0], dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def make_embedder(kind=EMBEDDINGS):
+    return HashingEmbedder() if kind == "hashing" else OllamaEmbedder(kind)
+
+
+# Cache of explanations looked up by meaning rather than exact text. Every stored
+# query's unit vector is a row of one NumPy matrix, so a lookup is a single
+# matrix-vector product. Entries live in SQLite and the matrix is rebuilt from
+# them on startup; the least recently used entries are evicted past max_entries.
+class SemanticCache:
+    def __init__(self, path=SEMANTIC_CACHE_PATH, embedder=None, threshold=SIMILARITY_THRESHOLD,
+                 max_entries=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.embedder = embedder or make_embedder()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS explanations ("
+            "id INTEGER PRIMARY KEY, embedder TEXT, query TEXT, response TEXT, "
+            "vector BLOB, created REAL, accessed REAL)"
+        )
+        self.conn.commit()
+
+        # Row i of the matrix belongs to ids[i]
+        self.ids = []
+        self.queries = []
+        self.accessed = np.zeros(0)
+        self.vectors = None
+        self._load()
+
+    # Build the matrix from the stored entries made by the current embedder
+    def _load(self):
+        with self.lock:
+            # Vectors from another embedder are not comparable, and old entries have expired
+            self.conn.execute("DELETE FROM explanations WHERE embedder != ?", (self.embedder.name,))
+            if self.ttl is not None:
+                self.conn.execute("DELETE FROM explanations WHERE created < ?", (time.time() - self.ttl,))
+            self.conn.commit()
+            rows = self.conn.execute("SELECT id, query, vector, accessed FROM explanations ORDER BY id").fetchall()
+            self.ids = [row[0] for row in rows]
+            self.queries = [row[1] for row in rows]
+            self.accessed = np.array([row[3] for row in rows], dtype=float)
+            self.vectors = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows]) if rows else None
+
+    def embed(self, query):
+        return self.embedder.embed(normalize_query(query))
+
+    # The closest stored queries as (similarity, row) pairs, best first. Caller holds the lock.
+    def _nearest(self, vector, k):
+        if self.vectors is None:
+            return []
+        similarities = self.vectors @ vector
+        k = min(k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        return sorted(((float(similarities[i]), int(i)) for i in top), reverse=True)
+
+    # Closest stored queries to a query as (similarity, query) pairs
+    def search(self, query, k=TOP_K):
+        vector = self.embed(query)
+        with self.lock:
+            return [(similarity, self.queries[row]) for similarity, row in self._nearest(vector, k)]
+
+    # Look up a query. Returns (response, similarity, vector): response is None on a miss,
+    # and vector can be passed to put() so the query is not embedded twice.
+    def lookup(self, query):
+        vector = self.embed(query)
+        now = time.time()
+        with self.lock:
+            nearest = self._nearest(vector, TOP_K)
+            for similarity, row in nearest:
+                if similarity < self.threshold:
+                    break
+                # "Solve 2x+3=7" and "solve 2x+3=8" look alike but need different answers
+                if NUMBER_RE.findall(self.queries[row]) != NUMBER_RE.findall(normalize_query(query)):
+                    continue
+                # So do "how does a vaccine work" and "why does a vaccine work"
+                if query_intent(self.queries[row]) != query_intent(query):
+                    continue
+                found = self.conn.execute("SELECT response, created FROM explanations WHERE id = ?",
+                                          (self.ids[row],)).fetchone()
+                if found is None or (self.ttl is not None and now - found[1] > self.ttl):
+                    continue
+                self.conn.execute("UPDATE explanations SET accessed = ? WHERE id = ?", (now, self.ids[row]))
+                self.conn.commit()
+                self.accessed[row] = now
+                self.hits += 1
+                return found[0], similarity, vector
+            self.misses += 1
+            return None, (nearest[0][0] if nearest else 0.0), vector
+
+    # Store the explanation for a query, replacing one stored for the same text
+    def put(self, query, response, vector=None):
+        query = normalize_query(query)
+        if vector is None:
+            vector = self.embed(query)
+        vector = np.asarray(vector, dtype=np.float32)
+        now = time.time()
+        with self.lock:
+            if query in self.queries:
+                self._remove(self.queries.index(query))
+            cursor = self.conn.execute(
+                "INSERT INTO explanations (embedder, query, response, vector, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self.embedder.name, query, response, vector.tobytes(), now, now)
+            )
+            self.ids.append(cursor.lastrowid)
+            self.queries.append(query)
+            self.accessed = np.append(self.accessed, now)
+            self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+            while len(self.ids) > self.max_entries:
+                self._remove(int(np.argmin(self.accessed)))
+            self.conn.commit()
+
+    # Drop matrix row i and its entry. Caller holds the lock.
+    def _remove(self, row):
+        self.conn.execute("DELETE FROM explanations WHERE id = ?", (self.ids[row],))
+        del self.ids[row]
+        del self.queries[row]
+        self.accessed = np.delete(self.accessed, row)
+        self.vectors = np.delete(self.vectors, row, axis=0) if self.ids else None
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM explanations")
+            self.conn.commit()
+            self.ids = []
+            self.queries = []
+            self.accessed = np.zeros(0)
+            self.vectors = None
+
+    # Counters for monitoring how well the cache is doing
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.ids),
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Process-wide semantic cache, loaded on first use (the launcher preloads it in the background)
+def get_semantic_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache()
+        return _cache
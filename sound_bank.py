@@ -0,0 +1,95 @@
+import os
+import time
+import threading
+
+# Folder the sound files live in
+SOUND_DIR = os.path.dirname(os.path.abspath(__file__))
+# UI sounds shared by every window
+SOUND_FILES = {
+    "hover": "hover.wav",
+    "click": "click.mp3",
+}
+# Each UI sound gets its own reserved mixer channel; a new play replaces the old one
+# instead of stacking up on free channels
+CHANNELS = {
+    "hover": 0,
+    "click": 1,
+}
+# Minimum seconds between two hover sounds when sweeping the mouse across buttons
+HOVER_INTERVAL = 0.08
+
+
+# Process-wide sound bank: the mixer is set up and each file decoded only once
+class SoundBank:
+    def __init__(self):
+        self.sounds = {}
+        self.channels = {}
+        self.available = True  # False if there is no audio device
+        self.loading = False
+        self.loaded = threading.Event()
+        self.lock = threading.Lock()
+        self.last_hover = 0.0
+
+    # Set up the mixer and decode every sound (safe to call more than once)
+    def load(self):
+        with self.lock:
+            if self.loaded.is_set():
+                return
+            try:
+                import pygame
+                if not pygame.mixer.get_init():
+                    pygame.mixer.init()
+                pygame.mixer.set_reserved(len(CHANNELS))
+                for name, file_name in SOUND_FILES.items():
+                    self.sounds[name] = pygame.mixer.Sound(os.path.join(SOUND_DIR, file_name))
+                for name, channel_id in CHANNELS.items():
+                    self.channels[name] = pygame.mixer.Channel(channel_id)
+            except Exception:
+                # No audio device or missing file: keep the app working, just silent
+                self.available = False
+            finally:
+                self.loaded.set()
+
+    # Load in a background thread so decoding never blocks the UI
+    def preload(self):
+        with self.lock:
+            if self.loading or self.loaded.is_set():
+                return
+            self.loading = True
+        threading.Thread(target=self.load, daemon=True).start()
+
+    # Play a sound on its own channel; skipped (not waited for) while still loading
+    def play(self, name):
+        if not self.loaded.is_set():
+            self.preload()
+            return
+        if not self.available:
+            return
+        self.channels[name].play(self.sounds[name])
+
+    # Hover sounds are rate limited so a mouse sweep plays at most one per HOVER_INTERVAL
+    def play_hover(self, event=None):
+        now = time.monotonic()
+        if now - self.last_hover < HOVER_INTERVAL:
+            return
+        self.last_hover = now
+        self.play("hover")
+
+    def play_click(self):
+        self.play("click")
+
+
+bank = SoundBank()
+
+
+# Module-level shortcuts for the shared bank, usable directly as Tk callbacks
+def preload():
+    bank.preload()
+
+
+def play_hover(event=None):
+    bank.play_hover(event)
+
+
+def play_click():
+    bank.play_click()
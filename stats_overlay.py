@@ -0,0 +1,66 @@
+import customtkinter as ctk
+import instrumentation
+from llm_cache import get_cache
+
+# How often the overlay refreshes (milliseconds)
+REFRESH_MS = 1000
+
+
+# Small always-on-top window with live model and UI responsiveness stats (toggle with F12)
+class StatsOverlay:
+    def __init__(self, root):
+        self.root = root
+        self.window = None
+        self.label = None
+        self.after_id = None
+
+    def toggle(self, event=None):
+        if self.window is not None and self.window.winfo_viewable():
+            self.hide()
+        else:
+            self.show()
+
+    def show(self):
+        if self.window is None or not self.window.winfo_exists():
+            self.window = ctk.CTkToplevel(self.root)
+            self.window.title("Stats")
+            self.window.geometry("380x260+20+20")
+            self.window.attributes("-topmost", True)
+            self.window.configure(fg_color="#0f1825")
+            self.window.protocol("WM_DELETE_WINDOW", self.hide)
+            self.label = ctk.CTkLabel(self.window, text="", font=("Courier", 13), justify="left", anchor="nw")
+            self.label.pack(fill="both", expand=True, padx=12, pady=12)
+        self.window.deiconify()
+        self.refresh()
+
+    def hide(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        if self.window is not None:
+            self.window.withdraw()
+
+    def refresh(self):
+        self.label.configure(text=format_stats(instrumentation.snapshot(), get_cache().stats()))
+        self.after_id = self.root.after(REFRESH_MS, self.refresh)
+
+
+def _value(value, unit=""):
+    return "-" if value is None else f"{value}{unit}"
+
+
+# Text shown in the overlay
+def format_stats(stats, cache_stats):
+    last = stats["last_call"]
+    lines = [
+        f"LLM calls (60s)   {stats['calls']}  ({stats['cache_hits']} cached, {stats['errors']} failed)",
+        f"Queue wait        {_value(stats['avg_queue_wait_ms'], ' ms')}",
+        f"First token       {_value(stats['avg_ttft_ms'], ' ms')}",
+        f"Total             {_value(stats['avg_total_ms'], ' ms')}",
+        f"Tokens/sec        {_value(stats['avg_tokens_per_sec'])}",
+        f"Cache hit rate    {cache_stats['hit_rate']:.0%} of {cache_stats['hits'] + cache_stats['misses']}",
+        f"Tk loop lag p95   {_value(stats['lag_p95_ms'], ' ms')}  (max {_value(stats['lag_max_ms'], ' ms')})",
+    ]
+    if last:
+        lines.append(f"Last: {last['tool']} {last['outcome']} in {_value(last['total_ms'], ' ms')}")
+    return "\n".join(lines)
@@ -0,0 +1,82 @@
+import math
+import time
+
+
+# Countdown worked out from a monotonic clock instead of counting ticks, so a late
+# or skipped tick never makes the session run long. Knows nothing about Tk.
+class TimerEngine:
+    def __init__(self, duration_seconds, clock=time.monotonic):
+        self.duration = duration_seconds
+        self.clock = clock  # Swappable for a fake clock when testing
+        self.started_at = None
+        self.paused_at = None
+        self.paused_total = 0.0
+
+    # Start (or restart) the countdown from the full duration
+    def start(self):
+        self.started_at = self.clock()
+        self.paused_at = None
+        self.paused_total = 0.0
+
+    # Stop the countdown and go back to the full duration
+    def reset(self):
+        self.started_at = None
+        self.paused_at = None
+        self.paused_total = 0.0
+
+    @property
+    def running(self):
+        return self.started_at is not None and not self.finished
+
+    @property
+    def paused(self):
+        return self.paused_at is not None
+
+    @property
+    def finished(self):
+        return self.started_at is not None and self.remaining() <= 0
+
+    # Pausing only records when it happened; the time spent paused is subtracted on resume
+    def pause(self):
+        if self.running and not self.paused:
+            self.paused_at = self.clock()
+
+    def resume(self):
+        if self.paused:
+            self.paused_total += self.clock() - self.paused_at
+            self.paused_at = None
+
+    def toggle_pause(self):
+        if self.paused:
+            self.resume()
+        else:
+            self.pause()
+
+    # Seconds of the session used so far, not counting pauses
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        now = self.paused_at if self.paused else self.clock()
+        return now - self.started_at - self.paused_total
+
+    # Exact seconds left (float)
+    def remaining(self):
+        return max(0.0, self.duration - self.elapsed())
+
+    # Whole seconds to show: rounds up, so the full duration shows until one second has passed
+    def display_seconds(self):
+        return math.ceil(self.remaining())
+
+    # Milliseconds until the displayed value changes, landing just after the second boundary
+    def ms_until_next_change(self):
+        remaining = self.remaining()
+        fraction = remaining - math.floor(remaining)
+        if fraction == 0:
+            fraction = 1.0
+        return max(1, math.ceil(fraction * 1000) + 1)
+
+
+# Format seconds as MM:SS (minutes keep growing past 59, like the original display)
+def format_time(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02}:{seconds:02}"
@@ -0,0 +1,66 @@
+import sys
+import threading
+
+# How often queued UI updates are applied (milliseconds, about 30 frames a second)
+FRAME_MS = 33
+
+
+# The one way worker threads change widgets. Tk is not thread-safe, so workers post
+# callbacks here and the UI thread runs them every FRAME_MS. An update posted with a
+# key replaces a queued one with the same key (keeping its place in line), so a burst
+# of updates to one widget costs a single redraw per frame. Updates without a key all
+# run, in the order they were posted.
+class UIDispatcher:
+    def __init__(self):
+        self.root = None
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.after_id = None
+        self.interval_ms = FRAME_MS
+        self.coalesced = 0  # Updates replaced by a newer one before they ran
+
+    # Start applying updates on root's event loop (the launcher does this once)
+    def start(self, root, interval_ms=FRAME_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        if self.after_id is None:
+            self.after_id = root.after(interval_ms, self._drain)
+
+    def stop(self):
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+
+    # Queue callback(*args) to run on the UI thread; safe to call from any thread
+    def post(self, callback, *args, key=None):
+        with self.lock:
+            if key is None:
+                key = object()
+            elif key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = (callback, args)
+
+    # UI thread: run everything queued since the last frame. Updates posted while
+    # these run (e.g. by a callback) wait for the next frame.
+    def _drain(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for callback, args in pending.values():
+            try:
+                callback(*args)
+            except Exception:
+                # Reported like an error in any other Tk callback, the other updates still run
+                self.root.report_callback_exception(*sys.exc_info())
+        self.after_id = self.root.after(self.interval_ms, self._drain)
+
+
+dispatcher = UIDispatcher()
+
+
+# Module-level shortcuts for the shared dispatcher
+def start(root, interval_ms=FRAME_MS):
+    dispatcher.start(root, interval_ms)
+
+
+def post(callback, *args, key=None):
+    dispatcher.post(callback, *args, key=key)
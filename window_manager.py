@@ -0,0 +1,44 @@
+# Keeps one window per tool under the launcher's single root. A window is built the
+# first time it is opened; closing it only hides it, and opening it again shows the
+# same window instead of building a new one. on_change(names), if given, is called with
+# the names of the open windows whenever one is shown or hidden.
+class WindowManager:
+    def __init__(self, root, on_change=None):
+        self.root = root
+        self.windows = {}
+        self.open = set()  # Shown and not hidden since (known before the window is mapped)
+        self.on_change = on_change
+
+    # Show the named tool window, building it with build(root) only if needed
+    def show(self, name, build):
+        window = self.windows.get(name)
+        if window is None or not window.winfo_exists():
+            window = build(self.root)
+            window.protocol("WM_DELETE_WINDOW", lambda: self.hide(name))
+            self.windows[name] = window
+        else:
+            window.deiconify()
+        window.lift()
+        window.focus_force()
+        self._changed(name, True)
+        return window
+
+    # Hide a tool window, letting it stop any work first through its optional on_hide hook
+    def hide(self, name):
+        window = self.windows.get(name)
+        if window is None or not window.winfo_exists():
+            return
+        on_hide = getattr(window, "on_hide", None)
+        if on_hide:
+            on_hide()
+        window.withdraw()
+        self._changed(name, False)
+
+    def _changed(self, name, shown):
+        before = set(self.open)
+        if shown:
+            self.open.add(name)
+        else:
+            self.open.discard(name)
+        if self.on_change and self.open != before:
+            self.on_change(sorted(self.open))